@@ -31,7 +31,9 @@ class MultipleFileField(forms.FileField):
             if file:
                 # 检查文件大小
                 if file.size > self.max_size:
-                    raise forms.ValidationError(f'文件 "{file.name}" 大小超过限制 (最大100MB)')
+                    raise forms.ValidationError(
+                        f'文件 "{file.name}" 大小超过限制 (最大{self.max_size // (1024 * 1024)}MB)'
+                    )
 
                 # 检查文件类型
                 if hasattr(self, 'allowed_types') and file.content_type not in self.allowed_types:
@@ -0,0 +1,278 @@
+"""
+图片的入库处理和衍生版本（不同宽度的 WebP / JPEG）。
+
+上传的图片先经过 normalize_image：只读取文件头检查格式和像素数，超过限制的直接拒绝，
+不会解码；通过检查的图片按 EXIF 方向旋转、缩小到 IMAGE_MAX_DIMENSION 以内，
+去掉 EXIF 等元数据后重新编码（动图逐帧处理），存储的始终是处理后的文件。
+
+图片记录创建后，在事务提交时交给进程内的后台线程池生成衍生版本，
+完成后把尺寸和衍生版本列表写回 Image，并重新渲染引用它的文章，
+渲染结果中的图片随之带上 srcset。
+衍生文件按源文件命名（blobs/aa/bb/<sha256>.png -> variants/aa/bb/<sha256>-480w.webp），
+内容相同的图片共用一套衍生版本。进程退出时未完成的任务由 generate_image_variants 命令补齐。
+"""
+import io
+import logging
+import os
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as PILImage, ImageOps, ImageSequence
+from blog.cache import invalidate_article_pages
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from .models import Article, Blob, Image
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'variants'
+VARIANT_SUFFIX_PATTERN = re.compile(r'-\d+w\.[a-z]+$')
+
+# (扩展名, Pillow 格式, 编码参数)
+VARIANT_FORMATS = [
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+# 允许上传的图片格式（Pillow 识别出的格式）
+# 很多手机拍摄的 JPEG 带有多张图片（MPO），按普通 JPEG 处理，只使用第一张
+INGEST_FORMATS = {'JPEG', 'MPO', 'PNG', 'GIF', 'WEBP'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # 延迟创建，保证线程池在 fork 之后的工作进程中创建
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def is_animated(source):
+    """
+    是否为动图；MPO 的多帧是同一张照片的附加图片，不算动图
+    """
+    return getattr(source, 'is_animated', False) and source.format != 'MPO'
+
+
+def normalize_image(uploaded_file):
+    """
+    上传图片的入库处理：检查格式和尺寸，旋转、缩小、去除元数据并重新编码
+    不透明图片编码为 JPEG，透明图片编码为 PNG；动图逐帧缩小后按原格式重新编码
+    :return: 处理后的 ContentFile，文件名扩展名与新格式一致
+    :raises ValidationError: 不是图片、格式不支持或像素数超过 IMAGE_MAX_PIXELS
+    """
+    name = uploaded_file.name
+    try:
+        # open 只解析文件头，像素数据在 load 时才解码
+        source = PILImage.open(uploaded_file)
+    except (PILImage.UnidentifiedImageError, PILImage.DecompressionBombError, OSError):
+        raise ValidationError(f'"{name}" 不是有效的图片文件')
+
+    with source:
+        if source.format not in INGEST_FORMATS:
+            raise ValidationError(f'不支持的图片格式: {source.format}')
+        width, height = source.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(f'图片 "{name}" 尺寸过大（{width}×{height}）')
+
+        stem = os.path.splitext(os.path.basename(name))[0] or 'image'
+        if is_animated(source):
+            return normalize_animation(source, name, stem)
+
+        max_dimension = settings.IMAGE_MAX_DIMENSION
+        if source.format in ('JPEG', 'MPO'):
+            # JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小，大图不必按原尺寸解码
+            source.draft(source.mode, (max_dimension, max_dimension))
+        try:
+            img = ImageOps.exif_transpose(source)
+        except (OSError, SyntaxError, ValueError):
+            raise ValidationError(f'"{name}" 不是有效的图片文件')
+        img.thumbnail((max_dimension, max_dimension), PILImage.LANCZOS)
+
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        # 只保留色彩配置，EXIF（拍摄位置、设备等）、XMP 和注释都不写入
+        options = {}
+        if source.info.get('icc_profile'):
+            options['icc_profile'] = source.info['icc_profile']
+
+        output = io.BytesIO()
+        if has_alpha:
+            img.convert('RGBA').save(output, 'PNG', optimize=True, **options)
+            ext = 'png'
+        else:
+            img.convert('RGB').save(output, 'JPEG', quality=85, optimize=True, progressive=True, **options)
+            ext = 'jpg'
+    return ContentFile(output.getvalue(), name=f'{stem}.{ext}')
+
+
+def normalize_animation(source, name, stem):
+    """
+    动图逐帧缩小到 IMAGE_MAX_DIMENSION 以内，去除元数据后按原格式（GIF / WebP / APNG）重新编码
+    所有帧解码后的像素总数不能超过 IMAGE_MAX_PIXELS
+    """
+    width, height = source.size
+    if width * height * source.n_frames > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(f'动图 "{name}" 帧数过多或尺寸过大（{width}×{height}，{source.n_frames} 帧）')
+
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    frames = []
+    durations = []
+    try:
+        for frame in ImageSequence.Iterator(source):
+            durations.append(frame.info.get('duration', 100))
+            frame = frame.convert('RGBA')
+            frame.thumbnail((max_dimension, max_dimension), PILImage.LANCZOS)
+            # convert 会复制 info（EXIF、XMP、注释），编码时不能带上
+            frame.info = {}
+            frames.append(frame)
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError(f'"{name}" 不是有效的图片文件')
+
+    image_format = source.format
+    options = {'save_all': True, 'append_images': frames[1:], 'duration': durations,
+               'loop': source.info.get('loop', 0)}
+    if image_format == 'GIF':
+        options['disposal'] = 2
+    elif image_format == 'WEBP':
+        options['quality'] = 80
+
+    output = io.BytesIO()
+    frames[0].save(output, image_format, **options)
+    ext = {'GIF': 'gif', 'WEBP': 'webp', 'PNG': 'png'}[image_format]
+    return ContentFile(output.getvalue(), name=f'{stem}.{ext}')
+
+
+def variant_stem(name):
+    """
+    源文件对应的衍生文件名前缀：blobs/aa/bb/<sha256>.png -> variants/aa/bb/<sha256>
+    """
+    stem = os.path.splitext(name)[0]
+    if Blob.is_blob_name(name):
+        stem = stem[len(Blob.BLOB_DIR) + 1:]
+    return posixpath.join(VARIANT_DIR, stem)
+
+
+def variant_source_stem(variant_name):
+    """
+    由衍生文件名反推源文件名（不含扩展名）：variants/aa/bb/<sha256>-480w.webp -> blobs/aa/bb/<sha256>
+    """
+    stem = VARIANT_SUFFIX_PATTERN.sub('', variant_name[len(VARIANT_DIR) + 1:])
+    if re.match(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}$', stem):
+        return posixpath.join(Blob.BLOB_DIR, stem)
+    return stem
+
+
+def generate_variants(name):
+    """
+    为源图片生成各个宽度的衍生版本（已存在的文件不重复编码）
+    :return: (宽度, 高度, 衍生版本列表)
+    """
+    stem = variant_stem(name)
+    variants = []
+    with default_storage.open(name) as f, PILImage.open(f) as source:
+        # 按 EXIF 方向旋转后的尺寸才是显示尺寸
+        img = ImageOps.exif_transpose(source)
+        width, height = img.size
+        # 动图缩放后会丢失动画，保持原样
+        if is_animated(source):
+            return width, height, variants
+
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        for target_width in sorted(settings.IMAGE_VARIANT_WIDTHS):
+            if target_width >= width:
+                break
+            target_height = max(1, round(height * target_width / width))
+            resized = None
+            for ext, image_format, options in VARIANT_FORMATS:
+                # JPEG 不支持透明度，透明图片只生成 WebP，回退使用原图
+                if image_format == 'JPEG' and has_alpha:
+                    continue
+                variant_name = f'{stem}-{target_width}w.{ext}'
+                path = default_storage.path(variant_name)
+                if not os.path.exists(path):
+                    if resized is None:
+                        resized = img.resize((target_width, target_height), PILImage.LANCZOS)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                    resized.save(tmp_path, image_format, **options)
+                    os.replace(tmp_path, path)
+                variants.append({
+                    'name': variant_name,
+                    'width': target_width,
+                    'height': target_height,
+                    'format': ext
+                })
+    return width, height, variants
+
+
+def update_image_variants(image):
+    """
+    生成衍生版本，写回所有内容相同的图片，并重新渲染引用它们的当前文章
+    """
+    name = image.content.name
+    width, height, variants = generate_variants(name)
+    Image.objects.filter(content=name).update(width=width, height=height, variants=variants)
+
+    for article in Article.objects.current().filter(images__content=name).distinct():
+        rerender_article(article)
+
+
+def rerender_article(article):
+    """
+    重新渲染文章的当前版本，并使它的页面缓存和片段缓存失效
+    """
+    article.render_content()
+    invalidate_article_pages(article.index_id)
+    # 详情页的附件片段按文章 ID 缓存，图片尺寸变了但键不变，需要单独删除
+    cache.delete(make_template_fragment_key('article_attachments', [article.id]))
+
+
+def run_variant_job(image_id):
+    try:
+        image = Image.objects.filter(pk=image_id).first()
+        if image is not None:
+            update_image_variants(image)
+    except Exception:
+        logger.exception('生成图片衍生版本失败: %s', image_id)
+    finally:
+        # 线程池中的线程不经过请求周期，需要自己关闭数据库连接
+        close_old_connections()
+
+
+def schedule_variants(image):
+    """
+    在事务提交后把图片交给后台线程池
+    """
+    image_id = image.pk
+    transaction.on_commit(lambda: get_executor().submit(run_variant_job, image_id))
+
+
+def delete_variants(name):
+    """
+    删除源文件的所有衍生版本
+    """
+    stem = variant_stem(name)
+    directory, prefix = posixpath.split(stem)
+    try:
+        _, filenames = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        if filename.startswith(prefix + '-'):
+            default_storage.delete(posixpath.join(directory, filename))
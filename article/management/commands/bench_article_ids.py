@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from article.models import Article, ArticleSearchToken, Article_index_id_ProductSequenceLock
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from user.models import CustomUser
+
+BENCH_TITLE = '__bench_article_ids__'
+
+
+class Command(BaseCommand):
+    help = '并发创建文章，对比旧的“行锁 + Max 聚合”与序列分配 index_id 的吞吐量（结束后删除测试数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='并发创建者数量')
+        parser.add_argument('--count', type=int, default=50, help='每个创建者创建的文章数')
+
+    def handle(self, *args, **options):
+        author = CustomUser.objects.order_by('-is_superuser').first()
+        if author is None:
+            raise CommandError('数据库中没有用户，无法创建测试文章')
+
+        workers = options['workers']
+        count = options['count']
+        total = workers * count
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(f'当前数据库为 {connection.vendor}，并发结果不具有代表性'))
+
+        # 每轮结束后立即清理，避免两种分配方式分配出重复的 index_id
+        for label, create in (('before (lock + Max)', self._create_locked),
+                              ('after  (sequence)  ', self._create_sequenced)):
+            try:
+                elapsed = self._run(create, author, workers, count)
+            finally:
+                bench_articles = Article.objects.filter(title=BENCH_TITLE)
+                # 序列分配的文章经过 Article.save，检索索引中也有它们的词元
+                ArticleSearchToken.objects.filter(
+                    article_index_id__in=bench_articles.values('index_id')
+                ).delete()
+                bench_articles.delete()
+            self.stdout.write(f'{label}: {total} inserts in {elapsed:.2f}s, {total / elapsed:.1f} inserts/sec')
+
+    @staticmethod
+    def _create_locked(author):
+        """
+        复现旧实现：锁住序列行，在锁内做 Max 聚合后插入
+        """
+        with transaction.atomic():
+            Article_index_id_ProductSequenceLock.objects.select_for_update().get_or_create(pk=1)
+            current_max = Article.objects.aggregate(max_val=models.Max('index_id'))['max_val']
+            article = Article(index_id=(current_max or 0) + 1, title=BENCH_TITLE, content='', author_id=author,
+                              is_current=True)
+            # 跳过 Article.save，只保留旧实现在锁内的一次插入
+            models.Model.save(article)
+
+    @staticmethod
+    def _create_sequenced(author):
+        Article(title=BENCH_TITLE, content='', author_id=author).save()
+
+    @staticmethod
+    def _run(create, author, workers, count):
+        barrier = threading.Barrier(workers + 1)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(count):
+                    create(author)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+            barrier.wait()
+            start = time.perf_counter()
+            for future in futures:
+                future.result()
+            return time.perf_counter() - start
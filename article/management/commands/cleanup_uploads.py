@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from article.images import delete_variants
+from article.models import Blob, TemporaryImage, UploadSession
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+# 每个事务最多删除的记录数
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = '删除过期的临时图片（编辑器中上传后没有随文章提交的图片）、过期的分块上传会话和未被引用的文件内容'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.TEMP_IMAGE_MAX_AGE)
+        image_count = 0
+        while True:
+            with transaction.atomic():
+                ids = list(TemporaryImage.objects.filter(
+                    created_at__lt=cutoff
+                ).values_list('pk', flat=True)[:BATCH_SIZE])
+                if not ids:
+                    break
+                # 逐条删除，post_delete 信号释放文件引用
+                _, counts = TemporaryImage.objects.filter(pk__in=ids).delete()
+                image_count += counts.get(TemporaryImage._meta.label, 0)
+
+        session_count = 0
+        stale = UploadSession.objects.filter(updated_at__lt=UploadSession.expiry_cutoff())
+        for session_id in list(stale.values_list('pk', flat=True)):
+            with transaction.atomic():
+                # 加锁后再确认一次，期间收到新分块的会话不删除
+                session = stale.select_for_update().filter(pk=session_id).first()
+                if session is not None:
+                    session.discard()
+                    session_count += 1
+
+        # 引用数归零后进程退出、没来得及在事务提交后删除的文件内容
+        blob_count = 0
+        for sha256, name in list(Blob.objects.filter(refcount=0).values_list('pk', 'name')):
+            if Blob.purge(sha256):
+                delete_variants(name)
+                blob_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已删除 {image_count} 张过期的临时图片，{session_count} 个过期的分块上传会话，'
+            f'{blob_count} 个未被引用的文件'
+        ))
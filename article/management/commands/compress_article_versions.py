@@ -0,0 +1,50 @@
+from article.models import Article
+from article.versions import apply_delta, encode_delta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = '把差异存储之前保存的完整旧版本改存为相对于后继版本的差异'
+
+    def handle(self, *args, **options):
+        index_ids = Article.objects.filter(
+            is_current=False,
+            content_delta__isnull=True
+        ).values_list('index_id', flat=True).distinct()
+
+        version_count = 0
+        bytes_before = 0
+        bytes_after = 0
+        for index_id in list(index_ids):
+            with transaction.atomic():
+                versions = Article.objects.select_for_update().filter(index_id=index_id).order_by('-created_at')
+                rows = list(versions.values_list(
+                    'pk', 'is_current', 'content', 'content_delta', 'content_html', 'toc_html', 'excerpt_html'
+                ))
+                # 从最新版本往旧版本走，successor 始终是后继版本的完整内容
+                successor = None
+                for pk, is_current, content, delta, content_html, toc_html, excerpt_html in rows:
+                    if delta is not None:
+                        successor = apply_delta(delta, successor)
+                        continue
+                    if not is_current and successor is not None:
+                        delta = encode_delta(successor, content)
+                        Article.objects.filter(pk=pk).update(
+                            content='',
+                            content_delta=delta,
+                            content_html='',
+                            toc_html='',
+                            excerpt_html='',
+                            render_version=0
+                        )
+                        version_count += 1
+                        bytes_before += sum(
+                            len(text.encode()) for text in (content, content_html, toc_html, excerpt_html)
+                        )
+                        bytes_after += len(delta)
+                    successor = content
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已转换 {version_count} 个旧版本，{bytes_before} 字节 -> {bytes_after} 字节'
+        ))
@@ -0,0 +1,83 @@
+import os
+
+from article.images import delete_variants, rerender_article
+from article.models import Article, ArticleSearchToken, Blob, File, Image, TemporaryFile
+from article.versions import apply_delta, encode_delta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+
+def rewrite_image_url(image_pk, old_url, new_url):
+    """
+    把引用这张图片的文章当前版本中的图片地址改为新地址并重新渲染
+    当前版本的内容变了，前一个版本的差异（相对于当前版本）需要按新内容重新编码
+    """
+    index_ids = Article.objects.current().filter(images__pk=image_pk).values_list('index_id', flat=True)
+    for index_id in list(index_ids):
+        versions = list(Article.objects.select_for_update().filter(index_id=index_id).order_by(
+            '-created_at'
+        ).values_list('pk', 'content', 'content_delta')[:2])
+        current_pk, content, _ = versions[0]
+        if old_url not in content:
+            continue
+        new_content = content.replace(old_url, new_url)
+        if len(versions) > 1 and versions[1][2] is not None:
+            previous_pk, _, delta = versions[1]
+            previous_content = apply_delta(delta, content)
+            Article.objects.filter(pk=previous_pk).update(content_delta=encode_delta(new_content, previous_content))
+        Article.objects.filter(pk=current_pk).update(content=new_content)
+
+        article = Article.objects.get(pk=current_pk)
+        ArticleSearchToken.index_article(article)
+        rerender_article(article)
+
+
+class Command(BaseCommand):
+    help = '把内容寻址存储之前上传的文件移入存储，相同内容只保留一份'
+
+    def handle(self, *args, **options):
+        blob_bytes_before = Blob.objects.filter(refcount__gt=0).aggregate(total=models.Sum('size'))['total'] or 0
+        # 旧路径 -> 已移入存储后的 Blob.name（旧数据中可能有多条记录指向同一个文件）
+        moved = {}
+        record_count = 0
+        moved_bytes = 0
+        missing = 0
+        rewritten_images = 0
+
+        for model, field in ((TemporaryFile, 'file'), (File, 'content'), (Image, 'content')):
+            legacy = model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__startswith': Blob.BLOB_DIR + '/'}
+            ).values_list('pk', field)
+            for pk, name in legacy.iterator(chunk_size=500):
+                with transaction.atomic():
+                    if name in moved:
+                        blob_name = Blob.reference(moved[name])
+                    else:
+                        path = default_storage.path(name)
+                        if not os.path.exists(path):
+                            missing += 1
+                            continue
+                        moved_bytes += os.path.getsize(path)
+                        blob_name = moved[name] = Blob.store_path(path, name)
+                    if model is Image:
+                        # 文章内容中直接保存图片地址，旧地址移走后会失效；衍生版本按新文件名重新生成
+                        model.objects.filter(pk=pk).update(**{field: blob_name, 'variants': []})
+                        rewrite_image_url(pk, default_storage.url(name), default_storage.url(blob_name))
+                        transaction.on_commit(lambda old_name=name: delete_variants(old_name))
+                        rewritten_images += 1
+                    else:
+                        model.objects.filter(pk=pk).update(**{field: blob_name})
+                record_count += 1
+
+        blob_bytes_after = Blob.objects.filter(refcount__gt=0).aggregate(total=models.Sum('size'))['total'] or 0
+        reclaimed = moved_bytes - (blob_bytes_after - blob_bytes_before)
+        self.stdout.write(self.style.SUCCESS(
+            f'已移入 {record_count} 条记录的文件（{len(moved)} 个文件，{moved_bytes} 字节），'
+            f'去重节省 {reclaimed} 字节；{missing} 个文件不存在，已跳过'
+        ))
+        if rewritten_images:
+            self.stdout.write(
+                f'已更新 {rewritten_images} 张图片在文章中的地址，'
+                f'请运行 python manage.py generate_image_variants 重新生成衍生版本'
+            )
@@ -0,0 +1,38 @@
+from article.images import update_image_variants
+from article.models import Image
+from django.core.management.base import BaseCommand
+from django.db import models
+
+
+class Command(BaseCommand):
+    help = '为还没有衍生版本的图片生成衍生版本并补齐尺寸（后台任务因进程退出未完成时使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='重新检查所有图片（已存在的衍生文件不会重复编码）'
+        )
+
+    def handle(self, *args, **options):
+        images = Image.objects.exclude(content='')
+        if not options['all']:
+            # 没有衍生版本或尺寸的图片（包括添加这两个字段之前上传的图片）
+            images = images.filter(models.Q(variants=[]) | models.Q(width__isnull=True))
+
+        # 内容相同的图片共用一套衍生版本，每个文件只处理一次
+        done = set()
+        failed = 0
+        for image in images.only('content', 'width', 'height').iterator(chunk_size=500):
+            name = image.content.name
+            if name in done:
+                continue
+            done.add(name)
+            try:
+                update_image_variants(image)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{name}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已处理 {len(done) - failed} 个图片文件，{failed} 个失败'
+        ))
@@ -0,0 +1,135 @@
+from article.models import Article, Blob, File, FileQuote, Image, ImageQuote
+from article.versions import apply_delta, encode_delta, versions_to_prune
+from comment.models import Comment
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+
+
+def text_bytes(*texts):
+    return sum(len(text.encode()) for text in texts)
+
+
+class Command(BaseCommand):
+    help = '按保留策略删除文章和评论的旧版本，每个事务最多删除 --batch-size 个版本'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-last', type=int, default=settings.VERSION_KEEP_LAST,
+                            help='保留最近的版本数')
+        parser.add_argument('--keep-days', type=int, default=settings.VERSION_KEEP_DAYS,
+                            help='最近多少天内每天保留一个版本，0 表示不按天保留')
+        parser.add_argument('--batch-size', type=int, default=settings.VERSION_PRUNE_BATCH_SIZE,
+                            help='每个事务最多删除的版本数')
+
+    def handle(self, *args, **options):
+        self.keep_last = max(options['keep_last'], 0)
+        self.keep_days = max(options['keep_days'], 0)
+        self.batch_size = max(options['batch_size'], 1)
+        self.now = timezone.now()
+        self.rows = {}
+        self.row_bytes = 0
+        self.file_bytes = 0
+
+        for index_id in self.candidates(Article):
+            while self.prune_article(index_id):
+                pass
+        for index_id in self.candidates(Comment):
+            while self.prune_comment(index_id):
+                pass
+
+        rows = '，'.join(f'{label} {count}' for label, count in sorted(self.rows.items())) or '无'
+        self.stdout.write(self.style.SUCCESS(
+            f'已删除的记录：{rows}；回收数据库内容 {self.row_bytes} 字节，文件 {self.file_bytes} 字节'
+        ))
+
+    def candidates(self, model):
+        """
+        版本数超过 keep_last 的 index_id，其余的没有可删除的版本
+        """
+        return list(model.objects.values('index_id').annotate(
+            version_count=models.Count('pk')
+        ).filter(version_count__gt=self.keep_last).values_list('index_id', flat=True))
+
+    def record_deleted(self, counts):
+        for label, count in counts.items():
+            if count:
+                self.rows[label] = self.rows.get(label, 0) + count
+
+    def prune_article(self, index_id):
+        """
+        删除一批文章旧版本，保持差异链可用：被删版本的前一个保留版本改存为相对于下一个保留版本的差异
+        :return: 是否还有待删除的版本
+        """
+        with transaction.atomic():
+            # 锁住所有版本，期间新版本的写入会等待（Article.save 对当前版本 select_for_update）
+            versions = list(Article.objects.select_for_update().filter(index_id=index_id).order_by(
+                '-created_at'
+            ).values_list('pk', 'created_at', 'is_current', 'content', 'content_delta'))
+            pruned = versions_to_prune(
+                [(pk, created_at, is_current) for pk, created_at, is_current, _, _ in versions],
+                self.keep_last, self.keep_days, self.now
+            )
+            batch = set(pruned[:self.batch_size])
+            if not batch:
+                return False
+
+            # 从新到旧重建内容；successor 是后继版本的内容，kept 是最近一个保留版本的内容
+            successor = kept = None
+            skipped = False
+            for pk, _, is_current, content, delta in versions:
+                if delta is not None:
+                    content = apply_delta(delta, successor)
+                successor = content
+                if pk in batch:
+                    self.row_bytes += len(delta) if delta is not None else text_bytes(content)
+                    skipped = True
+                    continue
+                if skipped and delta is not None:
+                    new_delta = encode_delta(kept, content)
+                    Article.objects.filter(pk=pk).update(content_delta=new_delta)
+                    self.row_bytes += len(delta) - len(new_delta)
+                kept = content
+                skipped = False
+
+            image_ids = set(ImageQuote.objects.filter(article__in=batch).values_list('image_id', flat=True))
+            file_ids = set(FileQuote.objects.filter(article__in=batch).values_list('file_id', flat=True))
+            _, counts = Article.objects.filter(pk__in=batch).delete()
+            self.record_deleted(counts)
+
+            # 只被删除的版本引用的图片和附件不再可见，删除记录并释放文件
+            self.delete_orphans(Image.objects.filter(pk__in=image_ids, articles__isnull=True))
+            self.delete_orphans(File.objects.filter(pk__in=file_ids, articles__isnull=True))
+        return len(pruned) > len(batch)
+
+    def delete_orphans(self, records):
+        names = list(records.values_list('content', flat=True))
+        sizes = dict(Blob.objects.filter(name__in=names).values_list('name', 'size'))
+        _, counts = records.delete()
+        self.record_deleted(counts)
+        # 引用数归零的文件在事务提交后删除
+        remaining = set(Blob.objects.filter(name__in=sizes, refcount__gt=0).values_list('name', flat=True))
+        self.file_bytes += sum(size for name, size in sizes.items() if name not in remaining)
+
+    def prune_comment(self, index_id):
+        """
+        删除一批评论旧版本
+        :return: 是否还有待删除的版本
+        """
+        with transaction.atomic():
+            versions = list(Comment.objects.select_for_update().filter(index_id=index_id).order_by(
+                '-create_time'
+            ).values_list('pk', 'create_time', 'is_current'))
+            pruned = versions_to_prune(versions, self.keep_last, self.keep_days, self.now)
+            batch = pruned[:self.batch_size]
+            if not batch:
+                return False
+
+            records = Comment.objects.filter(pk__in=batch)
+            self.row_bytes += sum(
+                text_bytes(content, content_html)
+                for content, content_html in records.values_list('content', 'content_html')
+            )
+            _, counts = records.delete()
+            self.record_deleted(counts)
+        return len(pruned) > len(batch)
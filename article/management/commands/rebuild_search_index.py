@@ -0,0 +1,31 @@
+from article.models import Article, ArticleSearchToken
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = '重建文章全文检索索引（只收录未删除文章的当前版本）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='每次批量写入的词元数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        articles = Article.objects.current().filter(deleted=False).only('index_id', 'title', 'content')
+        article_count = 0
+        token_count = 0
+
+        with transaction.atomic():
+            ArticleSearchToken.objects.all().delete()
+            rows = []
+            for article in articles.iterator(chunk_size=200):
+                rows.extend(ArticleSearchToken.build_rows(article))
+                article_count += 1
+                if len(rows) >= batch_size:
+                    ArticleSearchToken.objects.bulk_create(rows)
+                    token_count += len(rows)
+                    rows = []
+            ArticleSearchToken.objects.bulk_create(rows)
+            token_count += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f'已为 {article_count} 篇文章建立 {token_count} 个检索词元'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_current_versions(apps, schema_editor):
+    """
+    为每个 index_id 把 updated_at 最新的版本标记为当前版本
+    """
+    Article = apps.get_model('article', 'Article')
+    index_ids = Article.objects.values_list('index_id', flat=True).distinct()
+    for index_id in index_ids.iterator():
+        head = Article.objects.filter(index_id=index_id).order_by('-updated_at').values_list('pk', flat=True).first()
+        Article.objects.filter(pk=head).update(is_current=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('article', '0003_alter_article_options_alter_file_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='is_current',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_current_versions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('deleted', False), ('hidden', False), ('is_current', True)), fields=['-updated_at'], name='article_current_live_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='article',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('index_id',), name='unique_current_article_version'),
+        ),
+    ]
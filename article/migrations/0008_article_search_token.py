@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:04
+
+from article.search import token_weights
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    """
+    为所有未删除文章的当前版本建立检索索引
+    """
+    Article = apps.get_model('article', 'Article')
+    ArticleSearchToken = apps.get_model('article', 'ArticleSearchToken')
+    rows = []
+    articles = Article.objects.filter(is_current=True, deleted=False).only('index_id', 'title', 'content')
+    for article in articles.iterator(chunk_size=200):
+        rows.extend(
+            ArticleSearchToken(token=token, article_index_id=article.index_id, weight=weight)
+            for token, weight in token_weights(article.title, article.content).items()
+        )
+        if len(rows) >= 5000:
+            ArticleSearchToken.objects.bulk_create(rows)
+            rows = []
+    ArticleSearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('article', '0007_article_excerpt_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('article_index_id', models.IntegerField()),
+                ('weight', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': '文章检索词元',
+                'verbose_name_plural': '文章检索词元',
+                'indexes': [models.Index(fields=['article_index_id'], name='article_search_article_idx')],
+                'constraints': [models.UniqueConstraint(fields=('token', 'article_index_id'), name='unique_article_search_token')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
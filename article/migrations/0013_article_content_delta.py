@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('article', '0012_temporaryimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_delta',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('article', '0013_article_content_delta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='content',
+            field=models.ImageField(upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='temporaryimage',
+            name='content',
+            field=models.ImageField(upload_to='temp_images/'),
+        ),
+    ]
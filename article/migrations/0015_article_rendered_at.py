@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('article', '0014_image_dimensions_explicit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='rendered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,23 +1,100 @@
+import hashlib
+import os
 import uuid
+from datetime import timedelta
 
+from blog.rendering import RENDERER_VERSION, render_article, render_excerpt
+from blog.sequences import next_index_id
+from django.conf import settings
 from django.contrib import admin
-from django.db import models, transaction
+from django.core.files.move import file_move_safe
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from user.models import CustomUser
+from .search import MAX_TOKEN_LENGTH, query_tokens, token_weights
+from .versions import encode_delta, rebuild_content, version_cache
 
 
 # Create your models here.
+class ArticleQuerySet(models.QuerySet):
+    def current(self):
+        """
+        只返回每个 index_id 的当前版本（由 is_current 标记维护）
+        """
+        return self.filter(is_current=True)
+
+    def for_listing(self):
+        """
+        列表页只需要摘要，不加载正文和完整 HTML
+        """
+        return self.defer('content', 'content_html', 'toc_html')
+
+    def search(self, query):
+        """
+        通过倒排索引检索，要求命中查询的全部词元，按相关度排序
+        先从词元表按 token 取出命中全部词元的文章，只有这些文章才计算相关度，查询量与命中数成正比
+        """
+        tokens = query_tokens(query)
+        if not tokens:
+            return self.none()
+
+        matched_index_ids = ArticleSearchToken.objects.filter(
+            token__in=tokens
+        ).values('article_index_id').annotate(
+            matched=models.Count('token')
+        ).filter(matched=len(tokens)).values('article_index_id')
+
+        scores = ArticleSearchToken.objects.filter(
+            token__in=tokens,
+            article_index_id=models.OuterRef('index_id')
+        ).values('article_index_id').annotate(
+            score=models.Sum('weight')
+        ).values('score')
+
+        return self.filter(index_id__in=matched_index_ids).annotate(
+            search_rank=models.Subquery(scores)
+        ).order_by('-search_rank', '-updated_at')
+
+
 class Article_index_id_ProductSequenceLock(models.Model):
     """
-    一个用于生成 Article.index_id 的锁模型。
+    Article.index_id 的计数模型。
+    PostgreSQL 使用 article_index_id_seq 序列分配 index_id，
+    其他数据库使用这一行的 value 作为回退计数。
     这个表应该永远只有一行数据。
     """
-    pass
+    value = models.BigIntegerField(default=0)
 
     class Meta:
         verbose_name = "Article.index_id序列锁"
         verbose_name_plural = verbose_name
 
 
+class VersionConflict(Exception):
+    """
+    并发写入同一 index_id 的新版本时，撤下旧版本后仍有另一个当前版本（违反 is_current 唯一约束）
+    """
+
+
+# 等到旧的当前版本的行锁时，它可能已被并发的写入撤下，此时重新查询新的当前版本的次数
+HEAD_LOCK_ATTEMPTS = 3
+
+
+def lock_current_version(model, index_id, *fields):
+    """
+    锁住 index_id 的当前版本并返回它的字段，并发的新版本写入在这里排队
+    """
+    for _ in range(HEAD_LOCK_ATTEMPTS):
+        head = model.objects.select_for_update().filter(
+            index_id=index_id,
+            is_current=True
+        ).values_list(*fields).first()
+        if head is not None:
+            return head
+    return None
+
+
 class Article(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     index_id = models.IntegerField()
@@ -28,38 +105,117 @@ class Article(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted = models.BooleanField(default=False)
     hidden = models.BooleanField(default=False)
+    # 是否为该 index_id 的当前（最新）版本，由 save 维护
+    is_current = models.BooleanField(default=False)
+    # 保存时渲染好的 HTML、目录和列表摘要，render_version 与 RENDERER_VERSION 不一致时视为过期
+    content_html = models.TextField(blank=True, default='')
+    toc_html = models.TextField(blank=True, default='')
+    excerpt_html = models.TextField(blank=True, default='')
+    render_version = models.PositiveIntegerField(default=0)
+    # 最后一次渲染的时间；图片衍生版本生成后会重新渲染而不改变 updated_at，详情页的条件 GET 需要据此判断
+    rendered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # 旧版本相对于后继版本的压缩差异（见 article.versions），此时 content 和渲染结果为空；当前版本为 NULL
+    content_delta = models.BinaryField(null=True, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
+
+    @property
+    def is_delta_encoded(self):
+        return self.content_delta is not None
+
+    def full_content(self):
+        """
+        版本的完整内容，旧版本由差异重建
+        """
+        if not self.is_delta_encoded:
+            return self.content
+        return Article.reconstruct_content(self.pk)
 
-    def save(self, *args, **kwargs):
-        """
-        重写 save 方法，使用悲观锁来安全地生成 index_id。
-        """
-        # 只在新建对象且 index_id 未设置时执行
-        print(self.index_id)
-        if self.index_id is None:
-            # 使用 atomic 事务包裹整个操作
-            with transaction.atomic():
-                # 1. 获取锁对象并加锁
-                # select_for_update() 会锁定这一行，直到事务结束
-                # 其他试图获取这个锁的事务会在这里等待
-                try:
-                    lock = Article_index_id_ProductSequenceLock.objects.select_for_update().get(pk=1)
-                except Article_index_id_ProductSequenceLock.DoesNotExist:
-                    # 如果锁对象不存在，创建它（通常只需要在第一次运行时发生）
-                    lock = Article_index_id_ProductSequenceLock.objects.create(pk=1)
-
-                # 2. 在锁的保护下，安全地查询最大值并计算新值
-                # 因为有锁，所以这个查询不会被其他事务干扰
-                max_result = Article.objects.aggregate(max_val=models.Max('index_id'))
-                current_max = max_result['max_val']
-
-                self.index_id = (current_max or 0) + 1  # 如果为None, -1+1=0
-
-                # 3. 调用父类的 save() 方法保存当前对象
-                # 事务提交后，锁会自动释放
-                super().save(*args, **kwargs)
-        else:
-            # 如果是更新操作或 index_id 已被设置，则正常保存
-            super().save(*args, **kwargs)
+    @classmethod
+    def reconstruct_content(cls, pk):
+        """
+        重建任意版本的完整内容：一次查询取出它和所有后继版本的差异，从当前版本（或缓存中最近的版本）倒推
+        """
+        cached = version_cache.get(pk)
+        if cached is not None:
+            return cached
+        target = cls.objects.filter(pk=pk)
+        chain = list(cls.objects.filter(
+            index_id=target.values('index_id')[:1],
+            created_at__gte=target.values('created_at')[:1]
+        ).order_by('created_at').values_list('id', 'content', 'content_delta'))
+        if not chain:
+            raise cls.DoesNotExist
+        return rebuild_content(chain)
+
+    def render_content(self, save=True, images=None):
+        """
+        渲染 Markdown 内容（包括 [[img_id=N]] 图片引用）
+        save 为 True 时只把渲染结果写回数据库，不改变 updated_at
+        images 为 None 时使用已写入关联表的图片
+        """
+        if images is None:
+            images = [] if self._state.adding else self.images.all()
+        self.content_html, self.toc_html = render_article(self.content, images)
+        self.excerpt_html = render_excerpt(self.content)
+        self.render_version = RENDERER_VERSION
+        self.rendered_at = timezone.now()
+        if save:
+            Article.objects.filter(pk=self.pk).update(
+                content_html=self.content_html,
+                toc_html=self.toc_html,
+                excerpt_html=self.excerpt_html,
+                render_version=self.render_version,
+                rendered_at=self.rendered_at
+            )
+
+    def ensure_rendered(self):
+        """
+        渲染结果由旧版本渲染器生成时，重新渲染并写回
+        """
+        if self.render_version != RENDERER_VERSION:
+            self.render_content()
+
+    def save(self, *args, images=None, **kwargs):
+        """
+        重写 save 方法，从序列中分配 index_id。
+        新版本写入时在同一事务中把旧版本的 is_current 标记移交给自己。
+        Markdown 在这里渲染一次，读请求直接使用存储的结果；检索索引也在同一事务中更新。
+        images：新版本的图片关联还没有写入时，由调用方提供渲染用的图片
+        """
+        self.render_content(save=False, images=images)
+
+        with transaction.atomic():
+            # 只在新建对象且 index_id 未设置时执行
+            if self.index_id is None:
+                # 序列分配不需要全局锁，也不需要对整张表做 Max 聚合
+                self.index_id = next_index_id(Article, Article_index_id_ProductSequenceLock, 'article_index_id_seq')
+                self.is_current = True
+            elif self._state.adding:
+                # 为已有的 index_id 写入新版本：撤下旧的当前版本，它的内容改存为相对于新版本的差异
+                previous = lock_current_version(Article, self.index_id, 'pk', 'content')
+                if previous is not None:
+                    previous_pk, previous_content = previous
+                    Article.objects.filter(pk=previous_pk).update(
+                        is_current=False,
+                        content='',
+                        content_delta=encode_delta(self.content, previous_content),
+                        content_html='',
+                        toc_html='',
+                        excerpt_html='',
+                        render_version=0
+                    )
+                self.is_current = True
+
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                raise VersionConflict(f'文章 {self.index_id} 已被同时修改')
+
+            # 检索索引只收录当前版本
+            if self.is_current:
+                ArticleSearchToken.index_article(self)
 
     files = models.ManyToManyField(
         'File',
@@ -77,6 +233,222 @@ class Article(models.Model):
     class Meta:
         verbose_name = '文章'
         verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['index_id'],
+                condition=models.Q(is_current=True),
+                name='unique_current_article_version'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['-updated_at'],
+                condition=models.Q(is_current=True, deleted=False, hidden=False),
+                name='article_current_live_idx'
+            )
+        ]
+
+
+class ArticleSearchToken(models.Model):
+    """
+    文章全文检索的倒排索引，每个 (词元, 文章) 一行，只收录未删除文章的当前版本
+    """
+    token = models.CharField(max_length=MAX_TOKEN_LENGTH)
+    article_index_id = models.IntegerField()
+    weight = models.PositiveIntegerField()
+
+    @classmethod
+    def build_rows(cls, article):
+        return [
+            cls(token=token, article_index_id=article.index_id, weight=weight)
+            for token, weight in token_weights(article.title, article.content).items()
+        ]
+
+    @classmethod
+    def index_article(cls, article):
+        """
+        用文章当前版本的内容替换它在索引中的词元
+        """
+        cls.remove_article(article.index_id)
+        if not article.deleted:
+            cls.objects.bulk_create(cls.build_rows(article), batch_size=1000)
+
+    @classmethod
+    def remove_article(cls, index_id):
+        cls.objects.filter(article_index_id=index_id).delete()
+
+    class Meta:
+        verbose_name = '文章检索词元'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['token', 'article_index_id'],
+                name='unique_article_search_token'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['article_index_id'], name='article_search_article_idx')
+        ]
+
+
+class Blob(models.Model):
+    """
+    内容寻址存储中的一份文件内容。
+    文件保存在 blobs/<sha256 前两位>/<接下来两位>/<sha256><扩展名>，相同内容只保存一次；
+    TemporaryFile、File、Image 的文件字段直接保存 Blob.name，每条记录持有一个引用，
+    记录删除时（article.signals）释放引用，引用数归零的记录在事务提交后连同文件一起删除（purge）。
+    """
+    BLOB_DIR = 'blobs'
+    READ_BUFFER_SIZE = 1024 * 1024
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=100)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def is_blob_name(cls, name):
+        return bool(name) and name.startswith(cls.BLOB_DIR + '/')
+
+    @classmethod
+    def blob_name(cls, sha256, filename):
+        ext = os.path.splitext(filename)[1].lower()
+        if len(ext) > 10 or not ext[1:].isalnum():
+            ext = ''
+        return f'{cls.BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}'
+
+    @staticmethod
+    def digest(chunks):
+        """
+        :return: (sha256, 字节数)
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            hasher.update(chunk)
+            size += len(chunk)
+        return hasher.hexdigest(), size
+
+    @classmethod
+    def store(cls, content, filename):
+        """
+        保存上传的文件（UploadedFile / File）并持有一个引用
+        内容已存在时只增加引用计数，不写任何文件
+        :return: Blob.name
+        """
+        sha256, size = cls.digest(content.chunks())
+
+        def write(path):
+            if hasattr(content, 'temporary_file_path'):
+                # 大文件已经在磁盘上，直接移动
+                file_move_safe(content.temporary_file_path(), path, allow_overwrite=True)
+            else:
+                with open(path, 'wb') as f:
+                    for chunk in content.chunks():
+                        f.write(chunk)
+
+        return cls._reference_or_create(sha256, size, filename, write)
+
+    @classmethod
+    def store_path(cls, path, filename):
+        """
+        把磁盘上的文件（如分块上传的结果）移入存储并持有一个引用
+        内容已存在时删除该文件
+        :return: Blob.name
+        """
+        with open(path, 'rb') as f:
+            sha256, size = cls.digest(iter(lambda: f.read(cls.READ_BUFFER_SIZE), b''))
+
+        name = cls._reference_or_create(sha256, size, filename, lambda target: os.replace(path, target))
+        if os.path.exists(path):
+            os.remove(path)
+        return name
+
+    @classmethod
+    def reference(cls, name, filename=None):
+        """
+        为一条新记录增加对已有文件的引用（如临时文件转为正式附件）
+        不在存储中的旧文件会先被移入存储
+        :return: Blob.name
+        """
+        if cls.is_blob_name(name):
+            cls.objects.filter(name=name).update(refcount=models.F('refcount') + 1)
+            return name
+        return cls.store_path(default_storage.path(name), filename or name)
+
+    @classmethod
+    def release(cls, name):
+        """
+        释放一个引用；引用数归零时在事务提交后删除文件
+        :return: 文件内容是否已不再被引用
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.refcount == 0:
+                return False
+            cls.objects.filter(pk=blob.pk).update(refcount=models.F('refcount') - 1)
+            if blob.refcount > 1:
+                return False
+
+        transaction.on_commit(lambda: cls.purge(blob.pk))
+        return True
+
+    @classmethod
+    def purge(cls, sha256):
+        """
+        删除引用数为零的文件内容及其记录
+        引用数归零之后相同内容可能又被上传（_reference_or_create 会把引用数加回 1），
+        因此在行锁下重新检查；文件在行锁释放前删除，之后的上传发现记录不存在，会重新写入文件
+        :return: 是否已删除
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(sha256=sha256, refcount=0).first()
+            if blob is None:
+                return False
+            blob.delete()
+            default_storage.delete(blob.name)
+        return True
+
+    @classmethod
+    def _reference_or_create(cls, sha256, size, filename, write):
+        with transaction.atomic():
+            # 行锁保证与 release 串行
+            if cls.objects.filter(sha256=sha256).update(refcount=models.F('refcount') + 1):
+                return cls.objects.values_list('name', flat=True).get(sha256=sha256)
+
+            name = cls.blob_name(sha256, filename)
+            path = default_storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write(path)
+            try:
+                with transaction.atomic():
+                    cls.objects.create(sha256=sha256, name=name, size=size, refcount=1)
+            except IntegrityError:
+                # 相同内容被并发上传，使用先创建的那一份
+                cls.objects.filter(sha256=sha256).update(refcount=models.F('refcount') + 1)
+                existing = cls.objects.values_list('name', flat=True).get(sha256=sha256)
+                if existing != name:
+                    default_storage.delete(name)
+                name = existing
+            return name
+
+    class Meta:
+        verbose_name = '文件内容'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['name'], name='article_blob_name_idx')
+        ]
+
+
+def transfer_temporary(model, field, records):
+    """
+    删除已转为正式记录的临时记录。先清空文件字段，删除时的信号就不会释放内容引用，
+    引用原样留给正式记录
+    """
+    queryset = model.objects.filter(pk__in=[record.pk for record in records])
+    queryset.update(**{field: ''})
+    queryset.delete()
 
 
 class File(models.Model):
@@ -86,6 +458,19 @@ class File(models.Model):
     author_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def create_from_temporary(cls, temp_files):
+        """
+        把一组临时文件转为正式附件：不复制也不移动数据，临时文件对内容的引用直接转给附件，
+        临时文件记录随之删除。查询次数与文件数量无关
+        """
+        files = cls.objects.bulk_create([
+            cls(title=temp_file.filename, content=temp_file.file.name, author_id_id=temp_file.author_id_id)
+            for temp_file in temp_files
+        ])
+        transfer_temporary(TemporaryFile, 'file', temp_files)
+        return files
+
     class Meta:
         verbose_name = '文件附件'
         verbose_name_plural = verbose_name
@@ -110,12 +495,142 @@ class TemporaryFile(models.Model):
         verbose_name_plural = verbose_name
 
 
+class UploadSession(models.Model):
+    """
+    分块上传会话。分块按偏移量依次写入 MEDIA_ROOT/temp_files/partial/<id>.part，
+    连接中断后客户端查询已接收的字节数并从该位置继续；全部收到后转为 TemporaryFile。
+    超过 UPLOAD_SESSION_MAX_AGE 没有新分块的会话视为过期，由 cleanup_uploads 命令删除。
+    """
+    PARTIAL_DIR = 'temp_files/partial'
+    COPY_BUFFER_SIZE = 64 * 1024
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    file_size = models.IntegerField()  # 文件总大小（字节）
+    received = models.IntegerField(default=0)  # 已确认接收的字节数
+    author_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def active(cls):
+        """
+        未过期的会话
+        """
+        return cls.objects.filter(updated_at__gte=cls.expiry_cutoff())
+
+    @classmethod
+    def expiry_cutoff(cls):
+        return timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_MAX_AGE)
+
+    @property
+    def partial_path(self):
+        return os.path.join(settings.MEDIA_ROOT, self.PARTIAL_DIR, f'{self.id}.part')
+
+    @property
+    def progress(self):
+        if self.file_size == 0:
+            return 100
+        return round(self.received * 100 / self.file_size, 1)
+
+    def write_chunk(self, stream, length):
+        """
+        从 stream 流式读取 length 字节，写到已接收部分之后（覆盖上次中断时写了一半的数据）
+        :return: 实际写入的字节数
+        """
+        os.makedirs(os.path.dirname(self.partial_path), exist_ok=True)
+        written = 0
+        with open(self.partial_path, 'r+b' if os.path.exists(self.partial_path) else 'wb') as f:
+            f.seek(self.received)
+            while written < length:
+                block = stream.read(min(self.COPY_BUFFER_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+        return written
+
+    def finalize(self):
+        """
+        把已完整接收的文件移入内容寻址存储并创建 TemporaryFile，会话随之删除
+        调用方需要在事务中对会话加锁，保证只执行一次
+        """
+        if not os.path.exists(self.partial_path):
+            # 空文件不会收到任何分块
+            os.makedirs(os.path.dirname(self.partial_path), exist_ok=True)
+            open(self.partial_path, 'wb').close()
+        # 内容已存在时直接引用，不保留新数据
+        name = Blob.store_path(self.partial_path, self.filename)
+
+        temp_file = TemporaryFile.objects.create(
+            file=name,
+            filename=self.filename,
+            file_size=self.file_size,
+            author_id_id=self.author_id_id
+        )
+        self.delete()
+        return temp_file
+
+    def discard(self):
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        self.delete()
+
+    class Meta:
+        verbose_name = "分块上传会话"
+        verbose_name_plural = verbose_name
+
+
 class Image(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
+    # 不使用 width_field / height_field：尺寸为空的记录每次加载都会打开并解析文件
     content = models.ImageField(upload_to='images/')
     author_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # 原图尺寸，创建时从临时图片复制，生成衍生版本时按 EXIF 方向修正（旧记录由 generate_image_variants 补齐）
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # 后台生成的缩小版本：[{'name', 'width', 'height', 'format'}]，按宽度从小到大
+    variants = models.JSONField(default=list, blank=True)
+
+    def variant_srcset(self, image_format):
+        """
+        指定格式的衍生版本组成的 srcset
+        """
+        return ', '.join(
+            f"{default_storage.url(variant['name'])} {variant['width']}w"
+            for variant in self.variants
+            if variant['format'] == image_format
+        )
+
+    @property
+    def preview_url(self):
+        """
+        缩略图使用最小的衍生版本，还没有衍生版本时使用原图
+        """
+        if self.variants:
+            return default_storage.url(self.variants[0]['name'])
+        return self.content.url
+
+    @classmethod
+    def create_from_temporary(cls, temp_images, titles):
+        """
+        把一组临时图片转为正式图片，titles 与 temp_images 一一对应，做法同 File.create_from_temporary。
+        尺寸从临时图片复制，不再读取文件；bulk_create 不发送 post_save，衍生版本由调用方安排
+        """
+        images = cls.objects.bulk_create([
+            cls(
+                title=title,
+                content=temp_image.content.name,
+                width=temp_image.width,
+                height=temp_image.height,
+                author_id_id=temp_image.author_id_id
+            )
+            for temp_image, title in zip(temp_images, titles)
+        ])
+        transfer_temporary(TemporaryImage, 'content', temp_images)
+        return images
 
     class Meta:
         verbose_name = '图片'
@@ -132,3 +647,25 @@ admin.site.register(Article)
 admin.site.register(File)
 admin.site.register(Image)
 admin.site.register(TemporaryFile)
+
+
+class TemporaryImage(models.Model):
+    """
+    编辑文章时上传的图片（已经过入库处理）。提交文章时只有内容中引用到的才转为 Image，
+    其余的随之删除；放弃编辑留下的由 cleanup_uploads 命令在 TEMP_IMAGE_MAX_AGE 后删除
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content = models.ImageField(upload_to='temp_images/')
+    filename = models.CharField(max_length=255)
+    # 上传时从处理后的文件头读取
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    author_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "临时图片"
+        verbose_name_plural = verbose_name
+
+
+admin.site.register(TemporaryImage)
@@ -0,0 +1,66 @@
+"""
+文章全文检索的分词。
+
+站点以中文内容为主，按空白切分不可用：中文（CJK）连续片段切成单字和相邻二字组（bigram），
+英文和数字按单词切分并转为小写。查询时中文片段只使用二字组（单字片段使用单字），
+这样“数据库”会被拆成“数据”“据库”两个必须同时命中的词元。
+"""
+import re
+import unicodedata
+from collections import Counter
+
+# 标题中的词元权重高于正文
+TITLE_WEIGHT = 5
+
+# 与 ArticleSearchToken.token 的长度一致
+MAX_TOKEN_LENGTH = 64
+
+TOKEN_PATTERN = re.compile(
+    r'(?P<cjk>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]+)|(?P<word>[0-9a-z]+)'
+)
+
+
+def _normalize(text):
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def tokenize(text):
+    """
+    切分待索引的文本，返回词元列表（保留重复，用于计算权重）
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(_normalize(text)):
+        if match.group('word'):
+            tokens.append(match.group('word')[:MAX_TOKEN_LENGTH])
+            continue
+        run = match.group('cjk')
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_tokens(query):
+    """
+    切分查询文本，返回必须全部命中的词元集合
+    """
+    tokens = set()
+    for match in TOKEN_PATTERN.finditer(_normalize(query)):
+        if match.group('word'):
+            tokens.add(match.group('word')[:MAX_TOKEN_LENGTH])
+            continue
+        run = match.group('cjk')
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def token_weights(title, content):
+    """
+    计算一篇文章中每个词元的权重
+    """
+    weights = Counter(tokenize(content))
+    for token, count in Counter(tokenize(title)).items():
+        weights[token] += count * TITLE_WEIGHT
+    return weights
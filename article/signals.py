@@ -0,0 +1,53 @@
+from blog.cache import invalidate_article_pages
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .images import delete_variants, schedule_variants
+from .models import Article, Blob, File, Image, TemporaryFile, TemporaryImage
+from .suggest import title_index
+
+
+@receiver(post_save, sender=Article)
+def update_title_index(sender, instance, **kwargs):
+    """
+    文章的当前版本保存后，在事务提交时更新标题前缀索引
+    """
+    if instance.is_current:
+        transaction.on_commit(lambda: title_index.update(instance))
+
+
+@receiver(post_save, sender=Article)
+def invalidate_cached_pages(sender, instance, **kwargs):
+    """
+    文章的任意版本保存后，使它的详情页、评论页和文章列表的缓存失效
+    """
+    transaction.on_commit(lambda: invalidate_article_pages(instance.index_id))
+
+
+@receiver(post_delete, sender=TemporaryFile)
+@receiver(post_delete, sender=File)
+@receiver(post_delete, sender=Image)
+@receiver(post_delete, sender=TemporaryImage)
+def release_uploaded_file(sender, instance, **kwargs):
+    """
+    上传记录删除后释放它对文件内容的引用；不在内容寻址存储中的旧文件在事务提交后直接删除
+    """
+    name = (instance.file if sender is TemporaryFile else instance.content).name
+    if Blob.is_blob_name(name):
+        if Blob.release(name):
+            # 内容不再被引用时，图片的衍生版本一并删除（在 Blob.purge 之后执行，期间被重新上传的不删除）
+            transaction.on_commit(lambda: Blob.objects.filter(name=name).exists() or delete_variants(name))
+    elif name:
+        transaction.on_commit(lambda: default_storage.delete(name))
+        if sender is Image:
+            transaction.on_commit(lambda: delete_variants(name))
+
+
+@receiver(post_save, sender=Image)
+def generate_image_variants(sender, instance, created, **kwargs):
+    """
+    新图片在事务提交后交给后台线程池生成衍生版本
+    """
+    if created:
+        schedule_variants(instance)
@@ -0,0 +1,143 @@
+"""
+文章标题自动补全的进程内前缀索引。
+
+索引是按规范化标题排序的数组，前缀查询用 bisect 定位，不访问数据库。
+文章创建、修改、删除时在事务提交后增量更新（见 signals.py 和 article_delete）；
+多进程部署时其他进程的写入无法直接通知到本进程，
+因此索引每隔 REFRESH_SECONDS 秒从数据库整体重建一次。
+重建在后台线程中进行，期间查询继续使用旧索引；重建期间的增量更新记录下来，在替换索引后重放。
+只有进程内的第一次查询需要等待构建完成。
+"""
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.db import connection
+
+from .models import Article
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = 60
+
+
+def normalize_title(title):
+    return unicodedata.normalize('NFKC', title).lower()
+
+
+class TitlePrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一时间只进行一次重建
+        self._build_lock = threading.Lock()
+        self._entries = []  # 有序的 (规范化标题, index_id)
+        self._titles = {}  # index_id -> (规范化标题, 原标题)
+        self._loaded_at = None
+        self._refreshing = False
+        # 重建期间的增量更新 [(index_id, 标题或 None)]，不在重建时为 None
+        self._journal = None
+
+    def rebuild(self, max_age=None):
+        """
+        从数据库重建索引，只收录未删除且未隐藏文章的当前版本
+        :param max_age: 等到重建锁时索引已在 max_age 秒内构建过（其他线程刚完成重建），则不再重建
+        """
+        with self._build_lock:
+            loaded_at = self._loaded_at
+            if max_age is not None and loaded_at is not None and time.monotonic() - loaded_at <= max_age:
+                return
+            with self._lock:
+                self._journal = []
+            try:
+                rows = Article.objects.current().filter(
+                    deleted=False,
+                    hidden=False
+                ).values_list('index_id', 'title')
+                titles = {index_id: (normalize_title(title), title) for index_id, title in rows}
+                entries = sorted((key, index_id) for index_id, (key, _) in titles.items())
+                with self._lock:
+                    self._entries = entries
+                    self._titles = titles
+                    # 查询开始后提交的修改可能不在结果中，按顺序重放
+                    for index_id, title in self._journal:
+                        self._apply_locked(index_id, title)
+                    self._loaded_at = time.monotonic()
+            finally:
+                with self._lock:
+                    self._journal = None
+
+    def _background_rebuild(self):
+        try:
+            self.rebuild(max_age=REFRESH_SECONDS)
+        except Exception:
+            logger.exception('重建标题索引失败')
+        finally:
+            self._refreshing = False
+            # 线程结束前关闭它自己的数据库连接
+            connection.close()
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            # 第一次查询没有可用的索引，只能等待构建；并发的首次查询只构建一次
+            self.rebuild(max_age=REFRESH_SECONDS)
+        elif time.monotonic() - loaded_at > REFRESH_SECONDS:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._background_rebuild, name='title-index-rebuild', daemon=True).start()
+
+    def _apply_locked(self, index_id, title):
+        """
+        把一篇文章的标题写入索引，title 为 None 时从索引中删除
+        """
+        old = self._titles.pop(index_id, None)
+        if old is not None:
+            position = bisect_left(self._entries, (old[0], index_id))
+            del self._entries[position]
+        if title is not None:
+            key = normalize_title(title)
+            self._titles[index_id] = (key, title)
+            insort(self._entries, (key, index_id))
+
+    def _record(self, index_id, title):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((index_id, title))
+            if self._loaded_at is not None:
+                self._apply_locked(index_id, title)
+
+    def update(self, article):
+        """
+        用文章的当前版本更新索引
+        """
+        visible = not article.deleted and not article.hidden
+        self._record(article.index_id, article.title if visible else None)
+
+    def remove(self, index_id):
+        self._record(index_id, None)
+
+    def suggest(self, prefix, limit=10):
+        """
+        返回标题以 prefix 开头的文章 [(index_id, 标题)]
+        """
+        prefix = normalize_title(prefix.strip())
+        if not prefix:
+            return []
+        self._ensure_fresh()
+        results = []
+        with self._lock:
+            position = bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(results) < limit:
+                key, index_id = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                results.append((index_id, self._titles[index_id][1]))
+                position += 1
+        return results
+
+
+title_index = TitlePrefixIndex()
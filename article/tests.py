@@ -1,3 +1,223 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from user.models import CustomUser
+from .models import Article, Blob
+from .versions import apply_delta, encode_delta, version_cache
+
+
+def make_user(username='author'):
+    return CustomUser.objects.create_user(
+        username=username, password='password', email=f'{username}@example.com', student_number='20240001'
+    )
+
+
+class DeltaTests(TestCase):
+    """
+    差异的编码与应用
+    """
+    def assertRoundTrip(self, base, target):
+        self.assertEqual(apply_delta(encode_delta(base, target), base), target)
+
+    def test_round_trip(self):
+        self.assertRoundTrip('a\nb\nc\n', 'a\nB\nc\nd\n')
+        self.assertRoundTrip('标题\n\n正文第一段\n', '标题\n\n正文第一段\n正文第二段\n')
+
+    def test_empty_and_trailing_newline(self):
+        self.assertRoundTrip('', 'new\n')
+        self.assertRoundTrip('old\n', '')
+        self.assertRoundTrip('no newline', 'no newline\n')
+        self.assertRoundTrip('line\n', 'line')
+
+    def test_crlf_is_preserved(self):
+        self.assertRoundTrip('a\r\nb\r\n', 'a\r\nc\r\nb\r\n')
+
+
+class ArticleVersionTests(TestCase):
+    """
+    新版本写入后旧版本改存差异，读取时沿版本链重建
+    """
+    def setUp(self):
+        version_cache.clear()
+        self.user = make_user()
+
+    def tearDown(self):
+        version_cache.clear()
+
+    def save_version(self, content, index_id=None):
+        article = Article(index_id=index_id, title='标题', content=content, author_id=self.user)
+        article.save()
+        return article
+
+    def test_reconstruct_all_versions(self):
+        contents = [f'# 版本 {n}\n\n' + ''.join(f'第 {i} 行\n' for i in range(n, n + 5)) for n in range(5)]
+        first = self.save_version(contents[0])
+        versions = [first] + [self.save_version(content, first.index_id) for content in contents[1:]]
+
+        stored = dict(Article.objects.filter(index_id=first.index_id).values_list('pk', 'content_delta'))
+        for version in versions[:-1]:
+            self.assertIsNotNone(stored[version.pk])
+        self.assertIsNone(stored[versions[-1].pk])
+
+        # 从最旧的版本开始读，每次都要走完整条版本链
+        for version, content in zip(versions, contents):
+            version_cache.clear()
+            self.assertEqual(Article.reconstruct_content(version.pk), content)
+        # 再按缓存读一遍
+        for version, content in zip(versions, contents):
+            self.assertEqual(Article.objects.get(pk=version.pk).full_content(), content)
+
+    def test_only_latest_version_is_current(self):
+        first = self.save_version('v1')
+        self.save_version('v2', first.index_id)
+        latest = self.save_version('v3', first.index_id)
+        current = Article.objects.filter(index_id=first.index_id, is_current=True)
+        self.assertEqual(list(current.values_list('pk', flat=True)), [latest.pk])
+
+
+class PruneVersionsTests(TestCase):
+    """
+    prune_versions 删除旧版本后，保留的版本仍能重建
+    """
+    def setUp(self):
+        version_cache.clear()
+        self.user = make_user()
+
+    def tearDown(self):
+        version_cache.clear()
+
+    def test_chain_is_repaired_around_pruned_versions(self):
+        now = timezone.now()
+
+        def days_ago(days, hour):
+            return (now - timedelta(days=days)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+        # 从旧到新：(内容, 创建时间)；同一天的版本只保留最新的一个。
+        # v4 在开头插入了两行，v3 相对于 v4 的差异直接用在 v5 上会取错行
+        history = [
+            ('a\nb\nc\n', days_ago(10, 9)),
+            ('a\nb\nc\n二\n', days_ago(3, 9)),
+            ('a\nb\nc\n三\n', days_ago(3, 10)),
+            ('新的开头\n又一行\na\nb\nc\n三\n', days_ago(2, 9)),
+            ('a\nb\nc\n五\n', days_ago(2, 10)),
+            ('a\nb\nc\n六\n', now),
+        ]
+        first = Article(title='标题', content=history[0][0], author_id=self.user)
+        first.save()
+        versions = [first]
+        for content, _ in history[1:]:
+            article = Article(index_id=first.index_id, title='标题', content=content, author_id=self.user)
+            article.save()
+            versions.append(article)
+        for article, (_, created_at) in zip(versions, history):
+            Article.objects.filter(pk=article.pk).update(created_at=created_at)
+
+        call_command('prune_versions', keep_last=1, keep_days=5, batch_size=1, stdout=StringIO())
+
+        kept = {pk: content for pk, content in zip(
+            [article.pk for article in versions], [content for content, _ in history]
+        ) if Article.objects.filter(pk=pk).exists()}
+        self.assertEqual(list(kept.values()), [history[2][0], history[4][0], history[5][0]])
+        for pk, content in kept.items():
+            version_cache.clear()
+            self.assertEqual(Article.reconstruct_content(pk), content)
+
+    def test_nothing_to_prune(self):
+        first = Article(title='标题', content='v1', author_id=self.user)
+        first.save()
+        call_command('prune_versions', keep_last=5, keep_days=0, stdout=StringIO())
+        self.assertTrue(Article.objects.filter(pk=first.pk).exists())
+
+
+class BlobTests(TestCase):
+    """
+    内容寻址存储的引用计数
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def refcount(self, name):
+        return Blob.objects.values_list('refcount', flat=True).get(name=name)
+
+    def test_same_content_is_stored_once(self):
+        name = Blob.store(ContentFile(b'hello'), 'a.txt')
+        self.assertEqual(Blob.store(ContentFile(b'hello'), 'b.txt'), name)
+        self.assertEqual(self.refcount(name), 2)
+        self.assertEqual(Blob.objects.count(), 1)
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), b'hello')
+
+        self.assertEqual(Blob.reference(name), name)
+        self.assertEqual(self.refcount(name), 3)
+
+    def test_store_path_moves_file_into_store(self):
+        path = os.path.join(self.media_root, 'chunked.bin')
+        with open(path, 'wb') as f:
+            f.write(b'chunked upload')
+        name = Blob.store_path(path, 'chunked.bin')
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(default_storage.exists(name))
+
+        # 内容已存在时只增加引用并删除源文件
+        with open(path, 'wb') as f:
+            f.write(b'chunked upload')
+        self.assertEqual(Blob.store_path(path, 'again.bin'), name)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.refcount(name), 2)
+
+    def test_release_purges_last_reference_on_commit(self):
+        name = Blob.store(ContentFile(b'shared'), 'a.txt')
+        Blob.reference(name)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertFalse(Blob.release(name))
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(Blob.release(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_release_unknown_or_unreferenced(self):
+        self.assertFalse(Blob.release('blobs/00/00/missing.txt'))
+        name = Blob.store(ContentFile(b'once'), 'a.txt')
+        with self.captureOnCommitCallbacks():
+            self.assertTrue(Blob.release(name))
+        # 引用数已为零，重复释放不会变成负数
+        self.assertFalse(Blob.release(name))
+        self.assertEqual(self.refcount(name), 0)
+
+    def test_reupload_before_purge_keeps_file(self):
+        name = Blob.store(ContentFile(b'revived'), 'a.txt')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(Blob.release(name))
+        # 提交后的删除执行之前，相同内容又被上传
+        self.assertEqual(Blob.store(ContentFile(b'revived'), 'b.txt'), name)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        sha256 = Blob.objects.values_list('sha256', flat=True).get(name=name)
+        self.assertFalse(Blob.purge(sha256))
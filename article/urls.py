@@ -9,7 +9,16 @@ urlpatterns = [
     path('<int:index_id>/', article_detail, name='article_detail'),
     path('<int:index_id>/edit/', article_update, name='article_update'),
     path('<int:index_id>/delete/', article_delete, name='article_delete'),
+    path('<int:index_id>/history/', article_history, name='article_history'),
+    path('<int:index_id>/versions/', article_versions, name='article_versions'),
+    path('<int:index_id>/diff/<uuid:from_id>/<uuid:to_id>/', article_diff, name='article_diff'),
     path('upload-file/', upload_file, name='upload_file'),
     path('delete-temp-file/<uuid:file_id>/', delete_temp_file, name='delete_temp_file'),
     path('get-temp-files/', get_temp_files, name='get_temp_files'),
+    path('upload-image/', upload_image, name='upload_image'),
+    path('delete-temp-image/<uuid:image_id>/', delete_temp_image, name='delete_temp_image'),
+    path('uploads/', upload_init, name='upload_init'),
+    path('uploads/<uuid:upload_id>/', upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', upload_finalize, name='upload_finalize'),
+    path('suggest/', suggest_titles, name='suggest_titles'),
 ]
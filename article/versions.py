@@ -0,0 +1,140 @@
+"""
+文章历史版本的差异存储。
+
+当前版本保存完整内容；新版本写入时，被撤下的旧版本改为保存相对于它的后继版本的反向差异
+（old = apply_delta(delta, successor)），旧版本的 content 清空。读取旧版本时从当前版本出发，
+沿版本链依次应用差异重建，最近重建过的版本保存在进程内的 LRU 缓存中。
+
+差异按行计算，格式为 zlib 压缩的 JSON 列表：[i1, i2] 表示复制后继版本的第 i1 到 i2 行，
+字符串表示插入的文本。
+
+iter_diff 逐行生成两个版本之间的 unified diff，供历史页面比较版本。
+versions_to_prune 按保留策略选出可以删除的旧版本，由 prune_versions 命令使用。
+"""
+import difflib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.utils import timezone
+
+# 进程内缓存的已重建版本数
+VERSION_CACHE_SIZE = 64
+
+
+def encode_delta(base, target):
+    """
+    计算把 base 变为 target 的差异
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(target_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, ensure_ascii=False).encode(), 9)
+
+
+def apply_delta(delta, base):
+    """
+    对 base 应用 encode_delta 生成的差异，返回目标文本
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+class VersionCache:
+    """
+    线程安全的 LRU 缓存：文章版本 id -> 完整内容
+    版本写入后内容不再变化，缓存项不需要失效
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+version_cache = VersionCache(VERSION_CACHE_SIZE)
+
+
+def rebuild_content(chain):
+    """
+    由版本链重建最旧版本的内容
+    :param chain: [(id, content, content_delta), ...]，按从旧到新排列，
+                  最后一项（或任意已缓存的项）是完整内容的起点
+    """
+    start, content = None, None
+    for index, (version_id, full_content, delta) in enumerate(chain):
+        if delta is None:
+            start, content = index, full_content
+            break
+        cached = version_cache.get(version_id)
+        if cached is not None:
+            start, content = index, cached
+            break
+    if content is None:
+        raise ValueError('版本链缺少完整内容的版本')
+
+    for version_id, _, delta in reversed(chain[:start]):
+        content = apply_delta(delta, content)
+    version_cache.put(chain[0][0], content)
+    return content
+
+
+def iter_diff(old, new, fromfile='', tofile=''):
+    """
+    逐行生成 old 到 new 的 unified diff，每行以换行结尾
+    """
+    for line in difflib.unified_diff(
+            old.splitlines(keepends=True), new.splitlines(keepends=True), fromfile, tofile):
+        yield line if line.endswith('\n') else line + '\n'
+
+
+def versions_to_prune(versions, keep_last, keep_days, now=None):
+    """
+    按保留策略选出可以删除的版本：当前版本、最近 keep_last 个版本、
+    最近 keep_days 天内每天最新的一个版本保留，其余删除
+    :param versions: [(id, 创建时间, 是否当前版本), ...]，按从新到旧排列
+    :return: 要删除的版本 id 列表，从新到旧
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=keep_days)
+    kept_days = set()
+    pruned = []
+    for position, (version_id, created_at, is_current) in enumerate(versions):
+        day = created_at.date()
+        if is_current or position < keep_last:
+            kept_days.add(day)
+        elif keep_days and created_at >= cutoff and day not in kept_days:
+            kept_days.add(day)
+        else:
+            pruned.append(version_id)
+    return pruned
@@ -1,80 +1,65 @@
 import os
 import re
-import shutil
 import json
+import uuid
 
-import markdown
-
+from blog.cache import cache_anonymous_page, invalidate_article_pages
+from blog.conditional import conditional_page
+from blog.rendering import IMG_REFERENCE_PATTERN
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.images import get_image_dimensions
 from django.core.paginator import Paginator
-from django.db.models import Q, Max
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
 from .forms import ArticleForm
-from .models import Article, Image, ImageQuote, File, FileQuote, TemporaryFile
+from .images import normalize_image, schedule_variants
+from .models import Article, ArticleSearchToken, Blob, VersionConflict, Image, ImageQuote, File, FileQuote, TemporaryFile, TemporaryImage, UploadSession
+from .suggest import title_index
+from .versions import iter_diff
+
+# 附件大小上限
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+# 分块上传时每个分块的大小上限
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+# 历史版本列表每页的版本数
+HISTORY_PAGE_SIZE = 20
 
 
+@cache_anonymous_page('article_list')
 def article_list(request):
     """
     文章列表视图
     """
     search_query = request.GET.get('search', '')
 
-    # 获取每个index_id的最新版本文章
-    if search_query:
-        # 先获取符合条件的所有文章
-        all_articles = Article.objects.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query),
-            deleted=False,
-            hidden=False
-        )
-
-        # 按index_id分组，获取每个index_id的最新版本
-        latest_articles = {}
-        for article in all_articles:
-            if article.index_id not in latest_articles or article.updated_at > latest_articles[
-                article.index_id].updated_at:
-                latest_articles[article.index_id] = article
+    # 获取所有未删除且未隐藏文章的当前版本
+    articles = Article.objects.current().for_listing().filter(
+        deleted=False,
+        hidden=False
+    ).select_related('author_id')
 
-        articles = list(latest_articles.values())
-        # 按更新时间排序
-        articles.sort(key=lambda x: x.updated_at, reverse=True)
+    if search_query:
+        # 通过倒排索引检索当前版本，按相关度排序
+        articles = articles.search(search_query)
     else:
-        # 获取所有未删除且未隐藏文章的最新版本
-        subquery = Article.objects.filter(
-            deleted=False,
-            hidden=False
-        ).values('index_id').annotate(
-            max_updated=Max('updated_at')
-        )
-
-        articles = Article.objects.filter(
-            deleted=False,
-            hidden=False,
-            updated_at__in=[item['max_updated'] for item in subquery]
-        ).order_by('-updated_at')
-
-    # 为每篇文章生成Markdown摘要
-    md = markdown.Markdown(extensions=[
-        'markdown.extensions.extra',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.nl2br',
-    ])
-
-    for article in articles:
-        # 获取前200个字符作为摘要
-        content_preview = article.content[:200] + '...' if len(article.content) > 200 else article.content
-        article.content_preview = md.convert(content_preview)
+        articles = articles.order_by('-updated_at')
 
     # 分页处理
     paginator = Paginator(articles, 10)  # 每页显示10篇文章
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
+    # 摘要在保存时已生成，渲染器版本过期时才重新渲染
+    for article in page_obj:
+        article.ensure_rendered()
+
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
@@ -82,6 +67,22 @@ def article_list(request):
     return render(request, 'list.html', context)
 
 
+@require_http_methods(["GET"])
+def suggest_titles(request):
+    """
+    文章标题自动补全（AJAX），由进程内前缀索引应答，不访问数据库
+    """
+    prefix = request.GET.get('q', '')
+    suggestions = [
+        {'index_id': index_id, 'title': title}
+        for index_id, title in title_index.suggest(prefix)
+    ]
+    return JsonResponse({
+        'success': True,
+        'suggestions': suggestions
+    })
+
+
 @login_required
 def upload_file(request):
     """
@@ -91,16 +92,16 @@ def upload_file(request):
         uploaded_file = request.FILES['file']
         
         # 检查文件大小（100MB限制）
-        if uploaded_file.size > 100 * 1024 * 1024:
+        if uploaded_file.size > MAX_UPLOAD_SIZE:
             return JsonResponse({
                 'success': False,
                 'error': '文件大小超过100MB限制'
             }, status=400)
         
         try:
-            # 创建临时文件记录
+            # 创建临时文件记录，相同内容只保存一份
             temp_file = TemporaryFile.objects.create(
-                file=uploaded_file,
+                file=Blob.store(uploaded_file, uploaded_file.name),
                 filename=uploaded_file.name,
                 file_size=uploaded_file.size,
                 author_id=request.user
@@ -136,13 +137,7 @@ def delete_temp_file(request, file_id):
         try:
             temp_file = TemporaryFile.objects.get(id=file_id, author_id=request.user)
             
-            # 删除文件
-            if temp_file.file and temp_file.file.name:
-                file_path = os.path.join(settings.MEDIA_ROOT, temp_file.file.name)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            
-            # 删除数据库记录
+            # 删除数据库记录，文件内容的引用由 article.signals 释放
             temp_file.delete()
             
             return JsonResponse({'success': True})
@@ -163,6 +158,71 @@ def delete_temp_file(request, file_id):
     }, status=400)
 
 
+@login_required
+def upload_image(request):
+    """
+    文章图片上传视图（AJAX），编辑时选择的图片经过入库处理后保存为临时图片
+    """
+    if request.method == 'POST' and request.FILES.get('image'):
+        uploaded_image = request.FILES['image']
+
+        if uploaded_image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            return JsonResponse({
+                'success': False,
+                'error': f'图片大小超过{settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)}MB限制'
+            }, status=400)
+
+        try:
+            content = normalize_image(uploaded_image)
+        except ValidationError as e:
+            return JsonResponse({
+                'success': False,
+                'error': e.messages[0]
+            }, status=400)
+
+        width, height = get_image_dimensions(content)
+        temp_image = TemporaryImage.objects.create(
+            content=Blob.store(content, content.name),
+            filename=uploaded_image.name,
+            width=width,
+            height=height,
+            author_id=request.user
+        )
+        return JsonResponse({
+            'success': True,
+            'image_id': str(temp_image.id),
+            'filename': temp_image.filename,
+            'image_url': temp_image.content.url,
+            'width': temp_image.width,
+            'height': temp_image.height
+        })
+
+    return JsonResponse({
+        'success': False,
+        'error': '无效的请求'
+    }, status=400)
+
+
+@login_required
+def delete_temp_image(request, image_id):
+    """
+    删除临时图片视图（AJAX）
+    """
+    if request.method == 'DELETE' or (request.method == 'POST' and request.POST.get('_method') == 'DELETE'):
+        deleted, _ = TemporaryImage.objects.filter(id=image_id, author_id=request.user).delete()
+        if not deleted:
+            return JsonResponse({
+                'success': False,
+                'error': '图片不存在或无权限删除'
+            }, status=404)
+        return JsonResponse({'success': True})
+
+    return JsonResponse({
+        'success': False,
+        'error': '无效的请求'
+    }, status=400)
+
+
 @login_required
 def get_temp_files(request):
     """
@@ -198,6 +258,220 @@ def get_temp_files(request):
     }, status=400)
 
 
+def upload_status(session):
+    """
+    分块上传会话的进度信息
+    """
+    return {
+        'success': True,
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'file_size': session.file_size,
+        'received': session.received,
+        'progress': session.progress,
+        'chunk_size': UPLOAD_CHUNK_SIZE
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_init(request):
+    """
+    创建分块上传会话（AJAX）
+    """
+    filename = os.path.basename(request.POST.get('filename', '').strip())
+    try:
+        file_size = int(request.POST.get('file_size', ''))
+    except ValueError:
+        file_size = -1
+
+    if not filename or file_size < 0:
+        return JsonResponse({
+            'success': False,
+            'error': '无效的请求'
+        }, status=400)
+    if file_size > MAX_UPLOAD_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': '文件大小超过100MB限制'
+        }, status=400)
+
+    session = UploadSession.objects.create(
+        filename=filename[:255],
+        file_size=file_size,
+        author_id=request.user
+    )
+    return JsonResponse(upload_status(session))
+
+
+@login_required
+@require_http_methods(["GET", "PUT", "DELETE"])
+def upload_chunk(request, upload_id):
+    """
+    分块上传（AJAX）
+    GET：查询已接收的字节数，用于断点续传
+    PUT ?offset=N：请求体为从 offset 开始的一个分块，offset 必须等于已接收的字节数
+    DELETE：放弃上传
+    """
+    try:
+        session = UploadSession.active().get(id=upload_id, author_id=request.user)
+    except UploadSession.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': '上传不存在或已过期'
+        }, status=404)
+
+    if request.method == 'GET':
+        return JsonResponse(upload_status(session))
+
+    if request.method == 'DELETE':
+        session.discard()
+        return JsonResponse({'success': True})
+
+    try:
+        offset = int(request.GET.get('offset', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': '无效的请求'
+        }, status=400)
+
+    if offset != session.received:
+        # 客户端根据返回的 received 从正确的位置继续
+        status = upload_status(session)
+        status.update(success=False, error='偏移量与已接收的字节数不一致')
+        return JsonResponse(status, status=409)
+    if length <= 0 or length > UPLOAD_CHUNK_SIZE or offset + length > session.file_size:
+        return JsonResponse({
+            'success': False,
+            'error': '分块大小无效'
+        }, status=400)
+
+    # 请求体直接流式写入磁盘，不经过 request.body
+    written = session.write_chunk(request, length)
+    if written != length:
+        return JsonResponse({
+            'success': False,
+            'error': '分块数据不完整，请重试'
+        }, status=400)
+
+    # 同一分块的并发重试只有一个能推进进度
+    updated = UploadSession.objects.filter(id=session.id, received=offset).update(
+        received=offset + length,
+        updated_at=timezone.now()
+    )
+    session.refresh_from_db()
+    if not updated:
+        status = upload_status(session)
+        status.update(success=False, error='偏移量与已接收的字节数不一致')
+        return JsonResponse(status, status=409)
+    return JsonResponse(upload_status(session))
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_finalize(request, upload_id):
+    """
+    完成分块上传，生成与 upload_file 相同的临时文件（AJAX）
+    """
+    try:
+        with transaction.atomic():
+            session = UploadSession.active().select_for_update().get(id=upload_id, author_id=request.user)
+            if session.received != session.file_size:
+                status = upload_status(session)
+                status.update(success=False, error='文件尚未上传完成')
+                return JsonResponse(status, status=409)
+            temp_file = session.finalize()
+    except UploadSession.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': '上传不存在或已过期'
+        }, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'file_id': str(temp_file.id),
+        'filename': temp_file.filename,
+        'file_size': temp_file.file_size,
+        'file_url': temp_file.file.url
+    })
+
+
+def parse_uuids(values):
+    """
+    过滤掉表单中不是合法 UUID 的值
+    """
+    result = []
+    for value in values:
+        try:
+            result.append(uuid.UUID(value))
+        except ValueError:
+            continue
+    return result
+
+
+def promote_temporary_images(request, content, first_id):
+    """
+    把内容中引用到的临时图片转为正式图片
+    前端提交编辑器中上传的全部图片：image_id_mapping（前端图片ID列表）和顺序相同的 temp_images（临时图片ID列表），
+    后端从 first_id 开始按顺序给被引用的图片分配连续的图片ID；提交了但内容中未引用的临时图片随之删除
+    :return: (前端ID -> 后端ID, 后端ID -> Image)
+    """
+    try:
+        image_id_mapping = json.loads(request.POST.get('image_id_mapping', '[]'))
+    except json.JSONDecodeError:
+        image_id_mapping = []
+    temp_image_ids = request.POST.getlist('temp_images')
+    referenced_img_ids = set(IMG_REFERENCE_PATTERN.findall(content))
+
+    frontend_to_backend_id = {}
+    referenced = {}  # 后端ID -> 临时图片ID（UUID）
+    for frontend_id, temp_image_id in zip(image_id_mapping, temp_image_ids):
+        # 未引用的图片不占用后端ID，保持ID连续
+        if str(frontend_id) not in referenced_img_ids:
+            continue
+        backend_id = str(first_id + len(frontend_to_backend_id))
+        frontend_to_backend_id[str(frontend_id)] = backend_id
+        try:
+            temp_image_id = uuid.UUID(temp_image_id)
+        except ValueError:
+            continue
+        # 同一张临时图片只能转为一张正式图片
+        if temp_image_id not in referenced.values():
+            referenced[backend_id] = temp_image_id
+
+    # 一次查询取出全部临时图片，一次批量写入正式图片
+    temp_images = TemporaryImage.objects.filter(author_id=request.user).in_bulk(list(referenced.values()))
+    promoted = [
+        (backend_id, temp_images[temp_image_id])
+        for backend_id, temp_image_id in referenced.items()
+        if temp_image_id in temp_images
+    ]
+
+    images = Image.create_from_temporary(
+        [temp_image for _, temp_image in promoted],
+        [f"图片_{backend_id}" for backend_id, _ in promoted]
+    )
+    for image in images:
+        schedule_variants(image)
+    # 转为正式图片的临时记录已被删除，剩下的是编辑器中上传后又移除的图片
+    TemporaryImage.objects.filter(author_id=request.user, id__in=parse_uuids(temp_image_ids)).delete()
+    image_map = {backend_id: image for (backend_id, _), image in zip(promoted, images)}
+    return frontend_to_backend_id, image_map
+
+
+def promote_temporary_files(request):
+    """
+    把表单中选中的临时文件（selected_files）转为正式附件
+    """
+    temp_files = TemporaryFile.objects.filter(
+        author_id=request.user,
+        id__in=parse_uuids(request.POST.getlist('selected_files'))
+    )
+    return File.create_from_temporary(list(temp_files))
+
+
 @login_required
 def article_create(request):
     """
@@ -209,198 +483,49 @@ def article_create(request):
     if request.method == 'POST':
         form = ArticleForm(request.POST)
 
-        # 调试信息：检查请求中是否包含文件
-        if 'images' in request.FILES:
-            uploaded_images = request.FILES.getlist('images')
-            print(f"检测到 {len(uploaded_images)} 个上传的图片文件")
-        else:
-            print("未检测到上传的图片文件")
-
         if form.is_valid():
-            article = form.save(commit=False)
-            article.author_id = request.user
-            article.save()  # 保存以获取自动生成的index_id
-
-            # 处理上传的图片
-            uploaded_images = request.FILES.getlist('images')
-            image_map = {}  # 存储图片ID和对应的Image对象
-            temp_images = []  # 存储所有创建的图片对象，用于后续清理
-
-            # 获取前端传递的图片ID映射
-            image_id_mapping = []
-            if 'image_id_mapping' in request.POST:
-                try:
-                    image_id_mapping = json.loads(request.POST.get('image_id_mapping', '[]'))
-                    print(f"前端传递的图片ID映射: {image_id_mapping}")
-                except json.JSONDecodeError:
-                    print("解析图片ID映射失败")
-
-            # 创建前端ID到后端连续ID的映射
-            frontend_to_backend_id = {}
-            for idx, frontend_id in enumerate(image_id_mapping):
-                backend_id = str(idx + 1)
-                frontend_to_backend_id[str(frontend_id)] = backend_id
-                print(f"ID映射: 前端 {frontend_id} -> 后端 {backend_id}")
-
-            # 确保媒体目录存在
-            media_root = settings.MEDIA_ROOT
-            images_dir = os.path.join(media_root, 'images')
-            os.makedirs(images_dir, exist_ok=True)
-
-            # 先创建所有上传的图片对象，使用连续的后端ID
-            for idx, img_file in enumerate(uploaded_images):
-                # 使用连续的后端ID（从1开始）
-                img_id = str(idx + 1)
-
-                print(f"处理第 {idx + 1} 个图片文件: {img_file.name}, 分配后端ID: {img_id}")
-
-                # 创建Image对象并保存
-                image = Image.objects.create(
-                    title=f"图片_{img_id}",
-                    content=img_file,
-                    author_id=request.user
-                )
-
-                print(f"已创建Image对象，ID: {image.id}, 文件路径: {image.content.path}")
-
-                image_map[img_id] = image
-                temp_images.append((img_id, image))
-
-            # 分析文章内容，找出哪些图片ID被引用
-            content = article.content
-            referenced_img_ids = set()
-
-            # 查找所有[[img_id=数字]]模式
-            img_matches = re.findall(r'\[\[img_id=(\d+)]]', content)
-            referenced_img_ids.update(img_matches)
-
-            print(f"文章中引用的图片ID: {referenced_img_ids}")
-
-            # 将前端ID映射到后端连续ID
-            backend_referenced_img_ids = set()
-            for frontend_id in referenced_img_ids:
-                if frontend_id in frontend_to_backend_id:
-                    backend_id = frontend_to_backend_id[frontend_id]
-                    backend_referenced_img_ids.add(backend_id)
-                    print(f"引用ID映射: 前端 {frontend_id} -> 后端 {backend_id}")
-
-            # 只为被引用的图片创建ImageQuote关系
-            for img_id, image in temp_images:
-                if img_id in backend_referenced_img_ids:
-                    # 创建ImageQuote关系
-                    ImageQuote.objects.create(
-                        article=article,
-                        image=image
-                    )
-                    print(f"已为被引用的图片创建ImageQuote关系: {img_id}")
-                else:
-                    # 删除未被引用的图片
-                    print(f"删除未被引用的图片: {img_id}")
-                    # 删除图片文件
-                    if image.content and image.content.name:
-                        try:
-                            file_path = os.path.join(settings.MEDIA_ROOT, image.content.name)
-                            if os.path.exists(file_path):
-                                os.remove(file_path)
-                                print(f"已删除图片文件: {file_path}")
-                        except Exception as e:
-                            print(f"删除图片文件时出错: {e}")
-                    
-                    # 删除Image对象
-                    image.delete()
-                    print(f"已删除Image对象: {img_id}")
-
-            # 处理文章内容中的图片引用
-            content = article.content
-            # 使用正则表达式查找[[img_id=id]]模式
-            # 先处理转义字符
-            content = content.replace(r'\[', '[ESCAPED_LEFT_BRACKET]')
-            content = content.replace(r'\]', '[ESCAPED_RIGHT_BRACKET]')
-
-            # 查找并替换图片引用，将前端ID替换为后端连续ID
-            def replace_img_reference(match):
-                frontend_id = match.group(1)
-                if frontend_id in frontend_to_backend_id:
-                    backend_id = frontend_to_backend_id[frontend_id]
-                    if backend_id in image_map:
-                        image = image_map[backend_id]
-                        # 使用Django的url属性获取正确的URL
-                        image_url = image.content.url
-                        print(f"Django生成的图片URL: {image_url}")
-
-                        return f'![{image.title}]({image_url})'
-                return match.group(0)  # 如果找不到对应图片，保持原样
-
-            content = re.sub(r'\[\[img_id=(\d+)]]', replace_img_reference, content)
-
-            # 恢复转义字符
-            content = content.replace('[ESCAPED_LEFT_BRACKET]', '[')
-            content = content.replace('[ESCAPED_RIGHT_BRACKET]', ']')
-            print(content)
-
-            # 更新文章内容
-            article.content = content
-            
-            # 处理临时文件，将其转换为正式文件并与文章关联
-            selected_file_ids = request.POST.getlist('selected_files')
-            print(f"选中的文件ID: {selected_file_ids}")
-            
-            for file_id in selected_file_ids:
-                try:
-                    temp_file = TemporaryFile.objects.get(id=file_id, author_id=request.user)
-                    print(f"处理临时文件: {temp_file.filename}, ID: {temp_file.id}")
-                    
-                    # 确保文件目录存在
-                    files_dir = os.path.join(settings.MEDIA_ROOT, 'files')
-                    os.makedirs(files_dir, exist_ok=True)
-                    
-                    # 确保文件目录存在
-                    files_dir = os.path.join(settings.MEDIA_ROOT, 'files')
-                    os.makedirs(files_dir, exist_ok=True)
-                    
-                    # 获取临时文件路径
-                    temp_file_path = temp_file.file.path
-                    
-                    # 先创建正式文件记录（使用临时文件的路径，稍后会移动）
-                    file = File.objects.create(
-                        title=temp_file.filename,
-                        content=temp_file.file.name,  # 暂时使用临时文件的路径
-                        author_id=request.user
-                    )
-                    
-                    # 创建新的文件名，使用File对象的ID确保唯一性
-                    file_extension = os.path.splitext(temp_file.filename)[1]
-                    new_filename = f"{file.id}{file_extension}"
-                    new_file_path = os.path.join(files_dir, new_filename)
-                    
-                    # 移动文件到正式目录
-                    shutil.move(temp_file_path, new_file_path)
-                    
-                    # 更新File对象的content字段，指向新的文件路径
-                    file.content = f"files/{new_filename}"
-                    file.save()
-                    
-                    print(f"已创建正式文件: {file.title}, ID: {file.id}, 路径: {file.content.path}")
-                    
-                    # 创建文件与文章的关联
-                    FileQuote.objects.create(
-                        article=article,
-                        file=file
-                    )
-                    
-                    print(f"已创建文件与文章的关联")
-                    
-                    # 删除临时文件记录（但保留实际文件，因为File对象已经引用了它）
-                    temp_file.delete()
-                    print(f"已删除临时文件记录")
-                except TemporaryFile.DoesNotExist:
-                    print(f"临时文件不存在: {file_id}")
-                    continue
-                except Exception as e:
-                    print(f"处理临时文件时出错: {file_id}, 错误: {str(e)}")
-                    continue
-            
-            article.save()
+            # 图片、附件、文章和关联在同一个事务中写入，查询次数与附件数量无关
+            with transaction.atomic():
+                article = form.save(commit=False)
+                article.author_id = request.user
+
+                # 图片在编辑时已上传为临时图片，只有内容中引用到的才转为正式图片
+                frontend_to_backend_id, image_map = promote_temporary_images(request, article.content, 1)
+                # 选中的临时文件转为正式附件
+                files = promote_temporary_files(request)
+
+                # 处理文章内容中的图片引用
+                content = article.content
+                # 使用正则表达式查找[[img_id=id]]模式
+                # 先处理转义字符
+                content = content.replace(r'\[', '[ESCAPED_LEFT_BRACKET]')
+                content = content.replace(r'\]', '[ESCAPED_RIGHT_BRACKET]')
+
+                # 查找并替换图片引用，将前端ID替换为后端连续ID
+                def replace_img_reference(match):
+                    frontend_id = match.group(1)
+                    if frontend_id in frontend_to_backend_id:
+                        backend_id = frontend_to_backend_id[frontend_id]
+                        if backend_id in image_map:
+                            image = image_map[backend_id]
+                            return f'![{image.title}]({image.content.url})'
+                    return match.group(0)  # 如果找不到对应图片，保持原样
+
+                content = re.sub(r'\[\[img_id=(\d+)]]', replace_img_reference, content)
+
+                # 恢复转义字符
+                content = content.replace('[ESCAPED_LEFT_BRACKET]', '[')
+                content = content.replace('[ESCAPED_RIGHT_BRACKET]', ']')
+                article.content = content
+
+                # 只保存一次：index_id 分配、渲染和检索索引都在 save 中完成
+                article.save(images=image_map.values())
+                ImageQuote.objects.bulk_create([
+                    ImageQuote(article=article, image=image) for image in image_map.values()
+                ])
+                FileQuote.objects.bulk_create([
+                    FileQuote(article=article, file=file) for file in files
+                ])
 
             messages.success(request, '文章创建成功！')
             return redirect('article:article_detail', index_id=article.index_id)
@@ -414,15 +539,31 @@ def article_create(request):
     return render(request, 'create.html', {'form': form, 'temp_files': temp_files})
 
 
+def article_detail_validators(request, index_id):
+    """
+    文章详情页的条件 GET 校验：当前版本 id、渲染版本、更新时间和渲染时间
+    （图片衍生版本生成后正文会重新渲染，updated_at 不变）
+    """
+    head = Article.objects.current().filter(
+        index_id=index_id,
+        deleted=False
+    ).values_list('id', 'render_version', 'updated_at', 'rendered_at').first()
+    if head is None:
+        return None
+    return head, max(head[2], head[3] or head[2])
+
+
+@conditional_page(article_detail_validators)
+@cache_anonymous_page('article', 'index_id')
 def article_detail(request, index_id):
     """
     文章详情视图
     """
     # 使用index_id获取文章的最新版本
     try:
-        article = Article.objects.filter(
+        article = Article.objects.current().filter(
             index_id=index_id
-        ).order_by('-updated_at').first()
+        ).first()
 
         if not article:
             raise Article.DoesNotExist
@@ -438,41 +579,8 @@ def article_detail(request, index_id):
     files = article.files.all()
     images = article.images.all()
 
-    # 创建图片ID到图片对象的映射
-    image_map = {}
-    for idx, image in enumerate(images, 1):
-        image_map[str(idx)] = image
-
-    # 处理文章内容中的图片引用
-    content = article.content
-
-    # 查找并替换图片引用
-    def replace_img_reference(match):
-        img_id = match.group(1)
-        print('img_id', img_id)
-        if img_id in image_map:
-            image = image_map[img_id]
-
-            # 使用Django的url属性获取正确的URL
-            image_url = image.content.url
-            print(f"Django生成的图片URL: {image_url}")
-
-            return f'![{image.title}]({image_url})'
-        return match.group(0)  # 如果找不到对应图片，保持原样
-
-    content = re.sub(r'\[\[img_id=(\d+)]]', replace_img_reference, content)
-    print('content', content)
-
-    # 将Markdown内容转换为HTML
-    md = markdown.Markdown(extensions=[
-        'markdown.extensions.extra',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.toc',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.nl2br',
-    ])
-    article.content_html = md.convert(content)
-    article.toc = md.toc
+    # 使用保存时渲染好的HTML，渲染器版本过期时才重新渲染
+    article.ensure_rendered()
 
     context = {
         'article': article,
@@ -482,6 +590,73 @@ def article_detail(request, index_id):
     return render(request, 'detail.html', context)
 
 
+def save_article_version(request, form, old_article, existing_images, existing_files):
+    """
+    用编辑表单创建文章的新版本
+    :raises VersionConflict: 另一个编辑同时创建了新版本
+    """
+    # 新版本、图片、附件和关联在同一个事务中写入，查询次数与附件数量无关
+    with transaction.atomic():
+        # 创建新版本文章，使用相同的index_id
+        article = Article(
+            index_id=old_article.index_id,
+            title=form.cleaned_data['title'],
+            content=form.cleaned_data['content'],
+            author_id=request.user,
+            hidden=old_article.hidden
+        )
+
+        # 原有图片按编辑页中的编号（从1开始）保留勾选的部分，只删除新版本中的关联，保留图片供其他版本使用
+        keep_image_ids = set(request.POST.getlist('keep_images'))
+        old_images = list(existing_images)
+        kept_images = {
+            str(idx): image
+            for idx, image in enumerate(old_images, 1)
+            if str(image.id) in keep_image_ids
+        }
+
+        # 新图片在编辑时已上传为临时图片，只有内容中引用到的才转为正式图片，ID接在原有图片之后
+        frontend_to_backend_id, image_map = promote_temporary_images(
+            request, article.content, len(old_images) + 1
+        )
+        full_image_map = {**kept_images, **image_map}
+
+        # 原有附件保留勾选的部分，选中的临时文件转为正式附件
+        keep_file_ids = set(request.POST.getlist('keep_files'))
+        files = [file for file in existing_files if str(file.id) in keep_file_ids]
+        files += promote_temporary_files(request)
+
+        # 处理文章内容中的图片引用
+        content = article.content
+        content = content.replace(r'\[', '[ESCAPED_LEFT_BRACKET]')
+        content = content.replace(r'\]', '[ESCAPED_RIGHT_BRACKET]')
+
+        def replace_img_reference(match):
+            frontend_id = match.group(1)
+            # 先尝试使用前端ID映射，没有映射时直接使用ID查找
+            image = full_image_map.get(frontend_to_backend_id.get(frontend_id, frontend_id))
+            if image is not None:
+                return f'![{image.title}]({image.content.url})'
+            # 如果找不到对应的图片，返回空字符串（删除该引用）
+            return ''
+
+        content = re.sub(r'\[\[img_id=(\d+)]]', replace_img_reference, content)
+        content = content.replace('[ESCAPED_LEFT_BRACKET]', '[')
+        content = content.replace('[ESCAPED_RIGHT_BRACKET]', ']')
+        article.content = content
+
+        # 只保存一次：撤下旧版本、渲染和检索索引都在 save 中完成
+        images = list(full_image_map.values())
+        article.save(images=images)
+        ImageQuote.objects.bulk_create([
+            ImageQuote(article=article, image=image) for image in images
+        ])
+        FileQuote.objects.bulk_create([
+            FileQuote(article=article, file=file) for file in files
+        ])
+    return article
+
+
 @login_required
 def article_update(request, index_id):
     """
@@ -489,9 +664,9 @@ def article_update(request, index_id):
     """
     # 使用index_id获取文章的最新版本
     try:
-        old_article = Article.objects.filter(
+        old_article = Article.objects.current().filter(
             index_id=index_id
-        ).order_by('-updated_at').first()
+        ).first()
 
         if not old_article:
             raise Article.DoesNotExist
@@ -522,228 +697,14 @@ def article_update(request, index_id):
         form = ArticleForm(request.POST)
 
         if form.is_valid():
-            # 创建新版本文章，使用相同的index_id
-            article = Article(
-                index_id=old_article.index_id,
-                title=form.cleaned_data['title'],
-                content=form.cleaned_data['content'],
-                author_id=request.user,
-                hidden=old_article.hidden
-            )
-            article.save()
-
-            # 复制原有的文件关联到新文章
-            for file_quote in FileQuote.objects.filter(article=old_article):
-                FileQuote.objects.create(
-                    article=article,
-                    file=file_quote.file
-                )
-
-            # 复制原有的图片关联到新文章
-            for image_quote in ImageQuote.objects.filter(article=old_article):
-                ImageQuote.objects.create(
-                    article=article,
-                    image=image_quote.image
-                )
-
-            # 处理上传的新图片
-            uploaded_images = request.FILES.getlist('images')
-            image_map = {}
-            temp_images = []
-
-            # 获取前端传递的图片ID映射
-            image_id_mapping = []
-            if 'image_id_mapping' in request.POST:
-                try:
-                    image_id_mapping = json.loads(request.POST.get('image_id_mapping', '[]'))
-                    print(f"前端传递的图片ID映射: {image_id_mapping}")
-                except json.JSONDecodeError:
-                    print("解析图片ID映射失败")
-
-            # 获取现有图片数量，用于新图片的ID
-            existing_images_count = article.images.count()
-            next_image_id = existing_images_count + 1
-
-            # 创建前端ID到后端连续ID的映射
-            frontend_to_backend_id = {}
-            for idx, frontend_id in enumerate(image_id_mapping):
-                backend_id = str(next_image_id + idx)
-                frontend_to_backend_id[str(frontend_id)] = backend_id
-                print(f"ID映射: 前端 {frontend_id} -> 后端 {backend_id}")
-
-            # 确保媒体目录存在
-            media_root = settings.MEDIA_ROOT
-            images_dir = os.path.join(media_root, 'images')
-            os.makedirs(images_dir, exist_ok=True)
-
-            # 先创建所有上传的图片对象，使用连续的后端ID
-            for idx, img_file in enumerate(uploaded_images):
-                # 使用连续的后端ID
-                img_id = str(next_image_id + idx)
-
-                print(f"处理第 {idx + 1} 个图片文件: {img_file.name}, 分配后端ID: {img_id}")
-
-                # 创建Image对象并保存
-                image = Image.objects.create(
-                    title=f"图片_{img_id}",
-                    content=img_file,
-                    author_id=request.user
-                )
-
-                print(f"已创建Image对象，ID: {image.id}")
-                print(f"文件路径: {image.content.path}")
-                print(f"文件名: {image.content.name}")
-                print(f"文件URL: {image.content.url}")
-                print(f"文件是否存在: {os.path.exists(image.content.path)}")
-
-                image_map[img_id] = image
-                temp_images.append((img_id, image))
-
-            # 分析文章内容，找出哪些新图片ID被引用
-            content = article.content
-            referenced_img_ids = set()
-
-            img_matches = re.findall(r'\[\[img_id=(\d+)]]', content)
-            referenced_img_ids.update(img_matches)
-
-            # 将前端ID映射到后端连续ID
-            backend_referenced_img_ids = set()
-            for frontend_id in referenced_img_ids:
-                if frontend_id in frontend_to_backend_id:
-                    backend_id = frontend_to_backend_id[frontend_id]
-                    backend_referenced_img_ids.add(backend_id)
-                    print(f"引用ID映射: 前端 {frontend_id} -> 后端 {backend_id}")
-
-            # 只为被引用的新图片创建ImageQuote关系
-            referenced_imgs = []
-            for img_id, image in temp_images:
-                if img_id in backend_referenced_img_ids:
-                    ImageQuote.objects.create(
-                        article=article,
-                        image=image
-                    )
-                    print(img_id, '被引用', image.content.path)
-                    referenced_imgs.append(image)
-                else:
-                    # 修复：使用Django的delete()方法删除文件和数据库记录
-                    try:
-                        # FileField.delete()会自动删除物理文件和数据库记录
-                        image.content.delete(save=False)  # 先删除文件
-                        image.delete()  # 再删除Image对象
-                        print(f"已删除未被引用的图片: {image.title}")
-                    except Exception as e:
-                        print(f"删除图片文件时出错: {e}")
-                        image.delete()  # 至少删除数据库记录
-
-            # 处理已有图片的删除（只删除新文章中的关联，不删除图片文件本身）
-            keep_image_ids = request.POST.getlist('keep_images')
-            current_images = article.images.all()
-            for image in current_images:
-                if (str(image.id) not in keep_image_ids) and (image not in referenced_imgs or image not in image_map.values()):
-                    # 只删除新文章中的关联，保留图片文件供其他版本使用
-                    ImageQuote.objects.filter(article=article, image=image).delete()
-                    print(f"已从新版本中移除图片: {image.title}")
-
-            # 处理文章内容中的图片引用
-            content = article.content
-            content = content.replace(r'\[', '[ESCAPED_LEFT_BRACKET]')
-            content = content.replace(r'\]', '[ESCAPED_RIGHT_BRACKET]')
-
-            # 创建包含新旧图片的映射（注意：此时已删除的图片已经不在数据库中了，新图片已经关联）
-            full_image_map = {}
-            for idx, image in enumerate(article.images.all(), 1):
-                full_image_map[str(idx)] = image
-                print(f"已有图片映射: {idx} -> {image.title}, URL: {image.content.url}")
-
-            for img_id, image in image_map.items():
-                full_image_map[img_id] = image
-                print(f"新图片映射: {img_id} -> {image.title}, URL: {image.content.url}")
-
-            print(f"完整图片映射: {list(full_image_map.keys())}")
-
-            def replace_img_reference(match):
-                frontend_id = match.group(1)
-                print(f"处理图片引用: {frontend_id}")
-                # 先尝试使用前端ID映射
-                if frontend_id in frontend_to_backend_id:
-                    backend_id = frontend_to_backend_id[frontend_id]
-                    print(f"前端ID {frontend_id} 映射到后端ID {backend_id}")
-                    if backend_id in full_image_map:
-                        image = full_image_map[backend_id]
-                        image_url = image.content.url
-                        print(f"找到图片: {image.title}, URL: {image_url}")
-                        return f'![{image.title}]({image_url})'
-                # 如果没有映射，直接使用ID查找
-                if frontend_id in full_image_map:
-                    image = full_image_map[frontend_id]
-                    image_url = image.content.url
-                    print(f"直接找到图片: {image.title}, URL: {image_url}")
-                    return f'![{image.title}]({image_url})'
-                # 如果找不到对应的图片，返回空字符串（删除该引用）
-                print(f"警告：找不到ID为{frontend_id}的图片，删除该引用")
-                return ''
-
-            content = re.sub(r'\[\[img_id=(\d+)]]', replace_img_reference, content)
-            content = content.replace('[ESCAPED_LEFT_BRACKET]', '[')
-            content = content.replace('[ESCAPED_RIGHT_BRACKET]', ']')
-
-            article.content = content
-
-            # 处理临时文件，将其转换为正式文件并与文章关联
-            selected_file_ids = request.POST.getlist('selected_files')
-
-            for file_id in selected_file_ids:
-                try:
-                    temp_file = TemporaryFile.objects.get(id=file_id, author_id=request.user)
-
-                    files_dir = os.path.join(settings.MEDIA_ROOT, 'files')
-                    os.makedirs(files_dir, exist_ok=True)
-
-                    # 修复：正确获取临时文件的物理路径
-                    temp_file_path = temp_file.file.path if hasattr(temp_file.file, 'path') else None
-                    if not temp_file_path or not os.path.exists(temp_file_path):
-                        print(f"临时文件不存在或无法访问: {file_id}")
-                        continue
-
-                    file = File.objects.create(
-                        title=temp_file.filename,
-                        content=temp_file.file.name,
-                        author_id=request.user
-                    )
-
-                    file_extension = os.path.splitext(temp_file.filename)[1]
-                    new_filename = f"{file.id}{file_extension}"
-                    new_file_path = os.path.join(files_dir, new_filename)
-
-                    shutil.move(temp_file_path, new_file_path)
-
-                    file.content = f"files/{new_filename}"
-                    file.save()
-
-                    FileQuote.objects.create(
-                        article=article,
-                        file=file
-                    )
-
-                    # 删除临时文件记录（物理文件已经移动了）
-                    temp_file.delete()
-                except TemporaryFile.DoesNotExist:
-                    continue
-                except Exception as e:
-                    print(f"处理临时文件时出错: {file_id}, 错误: {str(e)}")
-                    continue
-
-            # 处理已有文件的删除（只删除新文章中的关联，不删除文件本身）
-            keep_file_ids = request.POST.getlist('keep_files')
-            current_files = article.files.all()
-            for file in current_files:
-                if str(file.id) not in keep_file_ids:
-                    # 只删除新文章中的关联，保留文件供其他版本使用
-                    FileQuote.objects.filter(article=article, file=file).delete()
-                    print(f"已从新版本中移除文件: {file.title}")
-
-            messages.success(request, '文章修改成功！新版本已创建')
-            return redirect('article:article_detail', index_id=article.index_id)
+            try:
+                article = save_article_version(request, form, old_article, existing_images, existing_files)
+            except VersionConflict:
+                # 另一个编辑同时创建了新版本，整个事务已回滚，保留表单内容让用户重新提交
+                form.add_error(None, '文章刚刚被其他人修改过，请刷新页面确认后重新提交')
+            else:
+                messages.success(request, '文章修改成功！新版本已创建')
+                return redirect('article:article_detail', index_id=article.index_id)
         else:
             print("表单验证失败:")
             print(form.errors)
@@ -772,10 +733,10 @@ def article_update(request, index_id):
             'title': old_article.title,
             'content': content
         })
-    article = Article.objects.filter(
+    article = Article.objects.current().filter(
         index_id=index_id,
         deleted=False
-    ).order_by('-updated_at').first()
+    ).first()
 
     return render(request, 'edit.html', {
         'form': form,
@@ -786,6 +747,112 @@ def article_update(request, index_id):
     })
 
 
+def history_article(request, index_id):
+    """
+    取出当前用户可以查看历史的文章（作者本人或管理员），只加载页面需要的字段
+    """
+    article = Article.objects.current().filter(
+        index_id=index_id,
+        deleted=False
+    ).only('index_id', 'title', 'author_id').first()
+    if article is None or (article.author_id_id != request.user.id and not request.user.is_staff):
+        return None
+    return article
+
+
+def version_page(index_id, page_number):
+    """
+    一页历史版本，从新到旧；只查询列表需要的字段，不读取内容和差异
+    """
+    versions = Article.objects.filter(index_id=index_id).order_by('-created_at').values(
+        'id', 'title', 'created_at', 'is_current'
+    )
+    page_obj = Paginator(versions, HISTORY_PAGE_SIZE).get_page(page_number)
+    page_obj.object_list = list(page_obj.object_list)
+    # 版本号从最旧的版本开始计数
+    first_number = page_obj.paginator.count - page_obj.start_index() + 1
+    for offset, version in enumerate(page_obj.object_list):
+        version['number'] = first_number - offset
+    return page_obj
+
+
+@login_required
+def article_history(request, index_id):
+    """
+    文章的历史版本页面
+    """
+    article = history_article(request, index_id)
+    if article is None:
+        return render(request, '404.html', status=404)
+
+    page_obj = version_page(index_id, request.GET.get('page'))
+    return render(request, 'history.html', {'article': article, 'page_obj': page_obj})
+
+
+@login_required
+def article_versions(request, index_id):
+    """
+    文章的历史版本列表（AJAX）
+    """
+    article = history_article(request, index_id)
+    if article is None:
+        return JsonResponse({
+            'success': False,
+            'error': '文章不存在或无权限查看'
+        }, status=404)
+
+    page_obj = version_page(index_id, request.GET.get('page'))
+    return JsonResponse({
+        'success': True,
+        'versions': [
+            {
+                'version_id': str(version['id']),
+                'number': version['number'],
+                'title': version['title'],
+                'created_at': version['created_at'].isoformat(),
+                'is_current': version['is_current']
+            }
+            for version in page_obj.object_list
+        ],
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages,
+        'count': page_obj.paginator.count
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def article_diff(request, index_id, from_id, to_id):
+    """
+    两个版本之间的 unified diff（纯文本）
+    差异在发送响应时才逐行计算，完整发送后按版本对缓存
+    """
+    article = history_article(request, index_id)
+    version_count = Article.objects.filter(index_id=index_id, pk__in=[from_id, to_id]).count()
+    if article is None or version_count != len({from_id, to_id}):
+        return JsonResponse({
+            'success': False,
+            'error': '版本不存在或无权限查看'
+        }, status=404)
+
+    cache_key = f'article_diff:{from_id}:{to_id}'
+    diff = cache.get(cache_key)
+    if diff is not None:
+        return HttpResponse(diff, content_type='text/plain; charset=utf-8')
+
+    def stream():
+        lines = []
+        old = Article.reconstruct_content(from_id)
+        new = Article.reconstruct_content(to_id)
+        for line in iter_diff(old, new, str(from_id), str(to_id)):
+            lines.append(line)
+            yield line
+        # 客户端中途断开时不会执行到这里，不完整的结果不会进入缓存
+        cache.set(cache_key, ''.join(lines), settings.ARTICLE_DIFF_CACHE_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type='text/plain; charset=utf-8')
+
+
 @login_required
 def article_delete(request, index_id):
     """
@@ -793,9 +860,9 @@ def article_delete(request, index_id):
     """
     # 使用index_id获取文章的所有版本
     try:
-        article = Article.objects.filter(
+        article = Article.objects.current().filter(
             index_id=index_id
-        ).order_by('-updated_at').first()
+        ).first()
 
         if not article:
             raise Article.DoesNotExist
@@ -814,8 +881,12 @@ def article_delete(request, index_id):
         return render(request, '404.html', status=404)
 
     if request.method == 'POST':
-        # 软删除所有版本
-        Article.objects.filter(index_id=index_id).update(deleted=True)
+        # 软删除所有版本（当前版本标记保持不变，详情页据此显示“已删除”）
+        with transaction.atomic():
+            Article.objects.filter(index_id=index_id).update(deleted=True)
+            ArticleSearchToken.remove_article(index_id)
+            transaction.on_commit(lambda: title_index.remove(index_id))
+            transaction.on_commit(lambda: invalidate_article_pages(index_id))
         messages.success(request, '文章已删除')
         return redirect('article:article_list')
 
@@ -0,0 +1,72 @@
+"""
+匿名访问的整页缓存。
+
+页面按 URL（含查询字符串）缓存，并归属到一个“页面组”。每个组在缓存中有一个版本号，
+页面的缓存键包含所属组的当前版本号；组内数据变化时替换版本号，该组所有页面随之失效：
+
+- article:<index_id>  文章详情页和它的全部评论页，文章或其评论变化时失效
+- article_list        文章列表页（含搜索），任意文章变化时失效
+
+使用共享缓存后端（Redis、Memcached）时，多个节点的失效同步生效；
+本地内存缓存只对当前进程有效，多进程部署应使用文件缓存或共享缓存。
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+
+
+def _group_version(group):
+    return cache.get_or_set(f'page_version:{group}', lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_page_group(group):
+    cache.set(f'page_version:{group}', uuid.uuid4().hex, None)
+
+
+def invalidate_article_pages(index_id):
+    """
+    文章的某个版本被保存或删除、或其评论发生变化后调用
+    """
+    invalidate_page_group(f'article:{index_id}')
+    invalidate_page_group('article_list')
+
+
+def invalidate_comment_pages(article_index_id):
+    invalidate_page_group(f'article:{article_index_id}')
+
+
+def cache_anonymous_page(group, kwarg=None):
+    """
+    缓存匿名用户的 GET 请求
+
+    :param group: 页面组名称
+    :param kwarg: 如果提供，用该视图参数的值拼接组名，例如 ('article', 'index_id') -> article:<index_id>
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # 登录用户、非 GET 请求和带有提示消息的请求都不使用缓存
+            if (request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                    or len(get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            group_name = group if kwarg is None else f'{group}:{kwargs[kwarg]}'
+            url_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            cache_key = f'page:{group_name}:{_group_version(group_name)}:{url_hash}'
+
+            response = cache.get(cache_key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies and not response.streaming:
+                cache.set(cache_key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
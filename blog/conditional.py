@@ -0,0 +1,47 @@
+"""
+条件 GET（ETag / Last-Modified）。
+
+视图提供一个只做一次廉价索引查询的校验函数，返回 (版本标识列表, 最后修改时间)；
+请求带有匹配的 If-None-Match / If-Modified-Since 时直接返回 304，不执行视图。
+页面中的导航和编辑按钮与当前用户有关，因此 ETag 中包含用户标识，
+Last-Modified 只对匿名用户提供。
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def conditional_page(get_validators):
+    """
+    :param get_validators: (request, **kwargs) -> (版本标识列表, 最后修改时间) 或 None（不做条件处理）
+    """
+    def validators(request, *args, **kwargs):
+        # etag 和 last_modified 共用同一次查询的结果
+        if not hasattr(request, '_page_validators'):
+            result = None
+            # 有待显示的提示消息时页面内容不可复用
+            if not len(get_messages(request)):
+                result = get_validators(request, *args, **kwargs)
+            request._page_validators = result
+        return request._page_validators
+
+    def etag_func(request, *args, **kwargs):
+        result = validators(request, *args, **kwargs)
+        if result is None:
+            return None
+        parts, _ = result
+        viewer = request.user.pk if request.user.is_authenticated else 'anonymous'
+        return hashlib.md5(':'.join(str(part) for part in (*parts, viewer)).encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        result = validators(request, *args, **kwargs)
+        if result is None or request.user.is_authenticated:
+            return None
+        last_modified = result[1]
+        if timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified)
+        return last_modified
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
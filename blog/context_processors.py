@@ -0,0 +1,10 @@
+from django.conf import settings
+
+
+def cache_timeouts(request):
+    """
+    模板片段缓存（{% cache %}）使用的过期时间
+    """
+    return {
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,58 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.utils import ConnectionHandler
+
+
+class Command(BaseCommand):
+    help = '对比“每个请求新建数据库连接”与当前连接配置（持久连接 / 连接池）下的单请求连接开销'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='模拟的请求数')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+
+        # 基准：关闭连接池和持久连接，每个请求都重新建立连接
+        baseline = copy.deepcopy(settings.DATABASES[DEFAULT_DB_ALIAS])
+        baseline['OPTIONS'].pop('pool', None)
+        baseline['CONN_MAX_AGE'] = 0
+        baseline['CONN_HEALTH_CHECKS'] = False
+        baseline_connection = ConnectionHandler({DEFAULT_DB_ALIAS: baseline})[DEFAULT_DB_ALIAS]
+
+        def fresh_connection_request():
+            baseline_connection.ensure_connection()
+            with baseline_connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            baseline_connection.close()
+
+        # 当前配置：与真实请求一样，在请求开始和结束时由 Django 决定关闭还是复用连接
+        def configured_request():
+            request_started.send(sender=self.__class__)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                request_finished.send(sender=self.__class__)
+
+        before = self._measure(fresh_connection_request, requests)
+        after = self._measure(configured_request, requests)
+        connection.close()
+
+        current = 'pool' if 'pool' in settings.DATABASES[DEFAULT_DB_ALIAS]['OPTIONS'] else \
+            f"CONN_MAX_AGE={settings.DATABASES[DEFAULT_DB_ALIAS]['CONN_MAX_AGE']}"
+        self.stdout.write(f'before (new connection per request): {before * 1000:.3f} ms/request')
+        self.stdout.write(f'after  ({current}): {after * 1000:.3f} ms/request')
+        self.stdout.write(f'saved per request: {(before - after) * 1000:.3f} ms')
+
+    @staticmethod
+    def _measure(func, requests):
+        func()  # 预热
+        start = time.perf_counter()
+        for _ in range(requests):
+            func()
+        return (time.perf_counter() - start) / requests
@@ -0,0 +1,217 @@
+"""
+媒体文件（附件、图片、临时文件）下载。
+
+先检查当前用户能否访问该文件，再选择发送方式：
+- MEDIA_ACCEL = 'nginx'：返回 X-Accel-Redirect，由 nginx 的 internal location 发送文件
+- MEDIA_ACCEL = 'apache'：返回 X-Sendfile，由 mod_xsendfile 发送文件
+- 未配置：Django 流式发送，支持单个 Range 请求；文件对象保留 fileno，
+  gunicorn 等服务器会用 sendfile 零拷贝发送，Python 进程不会读入整个文件
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from article.images import VARIANT_DIR, variant_source_stem
+from article.models import Article, Blob, File, Image, TemporaryFile, TemporaryImage
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+# 只支持单个区间；多区间请求按规范可以忽略，返回完整文件
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+MEDIA_CACHE_CONTROL = 'private, max-age=3600'
+
+
+class FileRange:
+    """
+    只暴露文件中 [start, start + length) 部分的只读文件对象。
+    read() 不会越过区间末尾；fileno() 和当前偏移量交给服务器做 sendfile，
+    发送长度由 Content-Length 限定。
+    """
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    解析 Range 头
+    :return: (start, end)，end 包含在内；None 表示忽略 Range 返回完整文件
+    :raises ValueError: 区间无法满足
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def media_access(request, name):
+    """
+    检查当前用户能否访问媒体文件
+    内容寻址存储中的同一个文件可能被多条记录引用，任意一条可访问即可
+    :return: (是否允许, 下载时使用的文件名或 None)
+    """
+    user = request.user
+    is_blob = Blob.is_blob_name(name)
+
+    if (is_blob or name.startswith('temp_files/')) and user.is_authenticated:
+        # 临时文件只有上传者本人可以访问
+        temp_files = TemporaryFile.objects.filter(file=name)
+        if not user.is_staff:
+            temp_files = temp_files.filter(author_id=user)
+        temp_file = temp_files.only('filename').first()
+        if temp_file is not None:
+            return True, temp_file.filename
+
+    if (is_blob or name.startswith('temp_images/')) and user.is_authenticated:
+        temp_images = TemporaryImage.objects.filter(content=name)
+        if not user.is_staff:
+            temp_images = temp_images.filter(author_id=user)
+        if temp_images.exists():
+            return True, None
+
+    for model, prefix in ((File, 'files/'), (Image, 'images/'), (Image, VARIANT_DIR + '/')):
+        if not (is_blob or name.startswith(prefix)):
+            continue
+        if prefix == VARIANT_DIR + '/':
+            # 衍生版本与源图片的访问权限相同
+            stem = variant_source_stem(name)
+            records = model.objects.filter(Q(content=stem) | Q(content__startswith=stem + '.'))
+        else:
+            records = model.objects.filter(content=name)
+        if not (user.is_authenticated and user.is_staff):
+            # 其他人只能访问自己上传的或未删除文章（任意版本）引用的文件
+            live_articles = Article.objects.current().filter(deleted=False).values('index_id')
+            visible = Q(articles__index_id__in=live_articles)
+            if user.is_authenticated:
+                visible |= Q(author_id=user)
+            records = records.filter(visible)
+        obj = records.only('title').first()
+        if obj is not None:
+            return True, obj.title if model is File else None
+
+    return False, None
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """
+    发送 MEDIA_ROOT 下的文件
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..'):
+        raise Http404('文件不存在')
+    fullpath = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.isfile(fullpath):
+        raise Http404('文件不存在')
+
+    allowed, download_name = media_access(request, name)
+    if not allowed:
+        # 不区分“不存在”和“无权访问”，避免泄露文件是否存在
+        raise Http404('文件不存在')
+
+    stat = os.stat(fullpath)
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(name)
+    # 压缩包等文件原样发送，不能让浏览器当作 Content-Encoding 解压
+    content_type = content_type or 'application/octet-stream'
+    if encoding:
+        content_type = 'application/octet-stream'
+
+    accel = settings.MEDIA_ACCEL
+    if accel:
+        # 文件内容、Range 和 sendfile 都交给前端代理处理
+        response = HttpResponse(content_type=content_type)
+        if accel == 'nginx':
+            response.headers['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        else:
+            response.headers['X-Sendfile'] = fullpath
+    else:
+        response = file_response(request, fullpath, stat.st_size, content_type, etag, last_modified)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = MEDIA_CACHE_CONTROL
+    if download_name:
+        response.headers['Content-Disposition'] = "attachment; filename*=UTF-8''%s" % quote(download_name)
+    return response
+
+
+def file_response(request, fullpath, size, content_type, etag, last_modified):
+    """
+    完整文件或单个区间的流式响应
+    """
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and if_range_matches(request.headers.get('If-Range'), etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response.headers['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(file, start, length), content_type=content_type, status=206)
+        response.headers['Content-Length'] = str(length)
+        response.headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def if_range_matches(if_range, etag, last_modified):
+    """
+    If-Range 与当前文件一致（或没有 If-Range）时才按 Range 返回部分内容
+    """
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
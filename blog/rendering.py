@@ -0,0 +1,132 @@
+"""
+Markdown 渲染。
+
+文章和评论在保存时渲染一次，HTML 与目录随源文本一起存入数据库，
+读请求直接使用存储的结果。存储时会记下 RENDERER_VERSION，
+修改下面的扩展列表或渲染规则时应当递增它，旧的渲染结果会在下次读取时重新生成。
+"""
+import re
+import xml.etree.ElementTree as etree
+
+import markdown
+from django.conf import settings
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+RENDERER_VERSION = 3
+
+# 列表页摘要取源文本的前 EXCERPT_LENGTH 个字符
+EXCERPT_LENGTH = 200
+
+ARTICLE_EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.toc',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.nl2br',
+]
+
+BASIC_EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.nl2br',
+]
+
+IMG_REFERENCE_PATTERN = re.compile(r'\[\[img_id=(\d+)]]')
+
+
+def replace_image_references(content, images):
+    """
+    将内容中的 [[img_id=N]] 替换为第 N 张图片的 Markdown 图片链接
+    """
+    image_map = {}
+    for idx, image in enumerate(images, 1):
+        image_map[str(idx)] = image
+
+    def replace_img_reference(match):
+        img_id = match.group(1)
+        if img_id in image_map:
+            image = image_map[img_id]
+            return f'![{image.title}]({image.content.url})'
+        return match.group(0)  # 如果找不到对应图片，保持原样
+
+    return IMG_REFERENCE_PATTERN.sub(replace_img_reference, content)
+
+
+class ResponsiveImageTreeprocessor(Treeprocessor):
+    """
+    为指向已上传图片的 <img> 加上尺寸、懒加载和 srcset；
+    有 WebP 衍生版本时用 <picture> 包裹，不支持 WebP 的浏览器回退到 <img>
+    """
+    def __init__(self, md, images):
+        super().__init__(md)
+        self.images = {image.content.url: image for image in images}
+
+    def run(self, root):
+        for parent in list(root.iter()):
+            for index, child in enumerate(parent):
+                if child.tag != 'img':
+                    continue
+                image = self.images.get(child.get('src'))
+                if image is None:
+                    continue
+                child.set('loading', 'lazy')
+                child.set('decoding', 'async')
+                if image.width and image.height:
+                    # 显式尺寸让浏览器在图片加载前预留位置，避免布局偏移
+                    child.set('width', str(image.width))
+                    child.set('height', str(image.height))
+                if not image.variants:
+                    continue
+
+                jpeg_srcset = image.variant_srcset('jpeg')
+                if jpeg_srcset:
+                    child.set('srcset', f'{jpeg_srcset}, {image.content.url} {image.width}w')
+                    child.set('sizes', settings.IMAGE_SIZES)
+                webp_srcset = image.variant_srcset('webp')
+                if webp_srcset:
+                    picture = etree.Element('picture')
+                    picture.tail, child.tail = child.tail, None
+                    etree.SubElement(picture, 'source', {
+                        'type': 'image/webp',
+                        'srcset': webp_srcset,
+                        'sizes': settings.IMAGE_SIZES,
+                    })
+                    picture.append(child)
+                    parent[index] = picture
+
+
+class ResponsiveImageExtension(Extension):
+    def __init__(self, images, **kwargs):
+        self.images = images
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        # 在 inline 之后运行，此时 ![]() 已经转换成 <img>
+        md.treeprocessors.register(ResponsiveImageTreeprocessor(md, self.images), 'responsive_image', 15)
+
+
+def render_article(content, images=()):
+    """
+    渲染文章内容，返回 (HTML, 目录 HTML)
+    """
+    images = list(images)
+    md = markdown.Markdown(extensions=ARTICLE_EXTENSIONS + [ResponsiveImageExtension(images)])
+    content_html = md.convert(replace_image_references(content, images))
+    return content_html, md.toc
+
+
+def render_comment(content):
+    """
+    渲染评论内容，返回 HTML
+    """
+    return markdown.Markdown(extensions=BASIC_EXTENSIONS).convert(content)
+
+
+def render_excerpt(content):
+    """
+    渲染列表页使用的摘要 HTML
+    """
+    excerpt = content[:EXCERPT_LENGTH] + '...' if len(content) > EXCERPT_LENGTH else content
+    return markdown.Markdown(extensions=BASIC_EXTENSIONS).convert(excerpt)
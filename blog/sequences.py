@@ -0,0 +1,31 @@
+"""
+index_id 序列分配器。
+
+PostgreSQL 上直接使用数据库原生 SEQUENCE：nextval() 不加行锁、不参与事务回滚，
+并发的创建请求之间互不等待，也不需要对整张表做 Max 聚合。
+其他数据库回退为计数行上的原子自增。行锁在 UPDATE 时取得，直到最外层事务提交才释放：
+调用方已在事务中时（如 Article.save），其他创建请求要等这个事务结束才能分配下一个 index_id。
+"""
+from django.db import connection, models, transaction
+
+
+def next_index_id(model, counter_model, sequence_name):
+    """
+    为 model 分配一个新的 index_id
+
+    :param model: 使用 index_id 的模型（仅在计数行缺失时用于初始化计数）
+    :param counter_model: 带 value 字段的计数模型，作为非 PostgreSQL 数据库的回退
+    :param sequence_name: PostgreSQL 中对应的 SEQUENCE 名称
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [sequence_name])
+            return cursor.fetchone()[0]
+
+    with transaction.atomic():
+        updated = counter_model.objects.filter(pk=1).update(value=models.F('value') + 1)
+        if not updated:
+            # 计数行不存在时（通常只在第一次运行时发生），从现有数据初始化
+            current_max = model.objects.aggregate(max_val=models.Max('index_id'))['max_val']
+            counter_model.objects.create(pk=1, value=(current_max or 0) + 1)
+        return counter_model.objects.values_list('value', flat=True).get(pk=1)
@@ -29,7 +29,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-3#3n&wrmcw=6(%27bn7kg)b!9j8a8_h_#c*#t#$x$p@mtbpw5t'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
 ALLOWED_HOSTS = ['*']
 
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # 项目级的管理命令（blog/management/commands）
+    'blog',
     'user',
     'article',
     'comment',
@@ -56,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.PreloadLinkMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +85,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.cache_timeouts',
             ],
             'builtins': ['django.templatetags.static'],
         },
@@ -94,6 +98,9 @@ WSGI_APPLICATION = 'blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_POOL=True 时使用 psycopg 3 的连接池，否则使用持久连接（CONN_MAX_AGE），两者不能同时使用
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -102,12 +109,68 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'SERVER'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
         'OPTIONS': {
             'options': '-c search_path=public'
         }
     }
 }
 
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        # 等待空闲连接的最长时间（秒）
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        # 空闲连接保留的最长时间（秒）
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+    }
+    if os.getenv('DB_POOL_CHECK', 'True').lower() == 'true':
+        # 从连接池取出连接时先检查连接是否仍然可用
+        DATABASES['default']['OPTIONS']['pool']['check'] = ConnectionPool.check_connection
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND: locmem（单进程）、file（单节点多进程）、redis / memcached（多节点共享）
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+# 页面缓存通过递增分组版本号失效，locmem 的版本号只在本进程内有效；
+# 多进程生产模式下默认使用 file，否则其他工作进程会在过期前一直返回旧页面
+SERVER_MODE = os.getenv('BLOG_SERVER_MODE', 'dev').lower()
+CACHE_BACKEND = os.getenv('CACHE_BACKEND') or ('file' if SERVER_MODE == 'production' else 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache') if CACHE_BACKEND == 'file' else ''),
+    }
+}
+
+# 匿名用户整页缓存的过期时间（秒），数据变化时会提前失效
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '600'))
+
+# 模板片段缓存的过期时间（秒），只用于详情页的附件列表（按文章版本区分，省去附件和图片查询）
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', '600'))
+
+# 文章两个版本之间差异的缓存时间（秒），版本写入后不再变化，可以缓存较长时间
+ARTICLE_DIFF_CACHE_TIMEOUT = int(os.getenv('ARTICLE_DIFF_CACHE_TIMEOUT', '86400'))
+
+# 文章和评论旧版本的保留策略（prune_versions 命令）：保留最近 VERSION_KEEP_LAST 个版本，
+# 以及最近 VERSION_KEEP_DAYS 天内每天的最后一个版本（0 表示不按天保留）；当前版本始终保留
+VERSION_KEEP_LAST = int(os.getenv('VERSION_KEEP_LAST', '10'))
+VERSION_KEEP_DAYS = int(os.getenv('VERSION_KEEP_DAYS', '30'))
+# 每个事务最多删除的版本数
+VERSION_PRUNE_BATCH_SIZE = int(os.getenv('VERSION_PRUNE_BATCH_SIZE', '200'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,11 +210,49 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# collectstatic 的输出目录：带指纹的文件名和 .gz / .br 压缩副本，DEBUG 关闭时由 blog.staticfiles.serve_static 提供
+STATIC_ROOT = os.getenv('STATIC_ROOT') or BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'blog.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# 每个页面都需要的关键资源，通过 Link: rel=preload 头提前加载
+STATIC_PRELOAD = [
+    ('css/main.css', 'style'),
+    ('css/all.min.css', 'style'),
+    ('webfonts/fa-solid-900.woff2', 'font'),
+]
 
 # Media files (uploads)
 # https://docs.djangoproject.com/en/5.2/topics/files/
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# 上传图片的限制：文件大小；文件头声明的像素数，超过的不解码直接拒绝（解码后约占 4 字节/像素）；
+# 入库时长边缩小到 IMAGE_MAX_DIMENSION 以内
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '24000000'))
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '2560'))
+# 图片衍生版本的宽度（像素）和后台生成线程数
+IMAGE_VARIANT_WIDTHS = [480, 960, 1600]
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+# 文章正文中图片的显示宽度，用于 srcset 的 sizes
+IMAGE_SIZES = '(max-width: 768px) 100vw, 730px'
+# 分块上传会话在最后一个分块之后保留的时间（秒），过期后不能继续上传，由 cleanup_uploads 命令删除
+UPLOAD_SESSION_MAX_AGE = int(os.getenv('UPLOAD_SESSION_MAX_AGE', '86400'))
+# 编辑器中上传、未随文章提交的临时图片保留的时间（秒），之后由 cleanup_uploads 命令删除
+TEMP_IMAGE_MAX_AGE = int(os.getenv('TEMP_IMAGE_MAX_AGE', '86400'))
+
+# 媒体文件由 blog.media.serve_media 检查权限后发送：
+# 留空由 Django 发送（支持 Range）；'nginx' 使用 X-Accel-Redirect，'apache' 使用 X-Sendfile
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '').lower()
+# nginx 中指向 MEDIA_ROOT 的 internal location
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
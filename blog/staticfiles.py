@@ -0,0 +1,136 @@
+"""
+静态文件：带内容哈希的文件名 + 预压缩。
+
+collectstatic 时把文件复制到 STATIC_ROOT，生成 main.<hash>.css 这样的指纹文件名，
+并为文本类文件写出 .gz / .br 压缩副本（.br 需要安装 brotli）。
+DEBUG 关闭时由 serve_static 提供这些文件：按 Accept-Encoding 直接返回压缩副本，
+指纹文件内容永不变化，因此可以带 immutable 缓存头。
+"""
+import functools
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 值得压缩的文本类文件
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico'}
+# 压缩后至少要小 5% 才保留压缩副本
+MIN_COMPRESSION_RATIO = 0.95
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 未带指纹的文件可能随部署变化，只做短时间缓存
+DEFAULT_CACHE_CONTROL = 'public, max-age=300'
+
+# (Accept-Encoding 中的名称, 压缩副本后缀)，按优先级排列
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # 模板里引用了清单中没有的文件时退回原文件名，而不是让页面报错
+    manifest_strict = False
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # CSS 中引用了项目没有附带的文件（如 Font Awesome 的 eot/ttf 回退格式、
+            # 第三方 JS 的 source map），保持原引用不变
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        stored_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            stored_names.add(name)
+            if hashed_name:
+                stored_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in sorted(stored_names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        """
+        为文件写出 .gz 和 .br 压缩副本，使用最高压缩级别（只在 collectstatic 时执行一次）
+        """
+        with self.open(name) as f:
+            data = f.read()
+
+        compressors = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            compressors.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+
+        for suffix, compress in compressors:
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            compressed = compress(data)
+            if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+                self._save(target, ContentFile(compressed))
+
+
+@functools.lru_cache(maxsize=None)
+def immutable_names():
+    """
+    清单中的指纹文件名（collectstatic 之后不会再变化，每个进程只读一次）
+    """
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve_static(request, path):
+    """
+    从 STATIC_ROOT 提供静态文件，优先返回与 Accept-Encoding 匹配的预压缩副本
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or os.path.splitext(name)[1] in ('.gz', '.br'):
+        raise Http404('文件不存在')
+    fullpath = staticfiles_storage.path(name)
+    if not os.path.isfile(fullpath):
+        raise Http404('文件不存在')
+
+    accepted = {
+        token.split(';')[0].strip().lower()
+        for token in request.headers.get('Accept-Encoding', '').split(',')
+    }
+    encoding = None
+    has_variants = False
+    for candidate, suffix in ENCODINGS:
+        if os.path.isfile(fullpath + suffix):
+            has_variants = True
+            if encoding is None and candidate in accepted:
+                encoding, fullpath = candidate, fullpath + suffix
+
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(
+            open(fullpath, 'rb'),
+            content_type=content_type or 'application/octet-stream'
+        )
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    if has_variants:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if name in immutable_names():
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+    return response
@@ -14,11 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from .media import serve_media
+from .staticfiles import serve_static
 from .views import *
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
 # 自定义错误处理
 handler404 = 'blog.views.custom_404'
@@ -32,6 +36,16 @@ urlpatterns = [
     path('comment/', include('comment.urls')),
 ]
 
-# 在开发环境中提供媒体文件服务
+# 媒体文件在检查权限后发送
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
+]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # 开发环境直接从 static/ 目录提供静态文件
+    urlpatterns += staticfiles_urlpatterns()
+else:
+    # 生产环境提供 collectstatic 生成的指纹文件和预压缩副本
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static),
+    ]
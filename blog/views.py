@@ -1,8 +1,10 @@
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render
+from .cache import cache_anonymous_page
 
 
 @require_http_methods(["GET"])
+@cache_anonymous_page('site')
 def index(request):
     return render(request, 'index.html')
 
@@ -0,0 +1,74 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from article.models import Article
+from comment.models import Comment
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from user.models import CustomUser
+
+BENCH_CONTENT = '__bench_comment_create__'
+
+
+class Command(BaseCommand):
+    help = '并发向 comment:comment_create 提交评论，报告吞吐量与 p50/p99 延迟（结束后删除测试数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('article_index_id', type=int, help='被评论文章的 index_id')
+        parser.add_argument('--workers', type=int, default=16, help='并发提交者数量')
+        parser.add_argument('--count', type=int, default=50, help='每个提交者提交的评论数')
+
+    def handle(self, *args, **options):
+        article_index_id = options['article_index_id']
+        if not Article.objects.current().filter(index_id=article_index_id, deleted=False).exists():
+            raise CommandError(f'文章 {article_index_id} 不存在或已被删除')
+        author = CustomUser.objects.order_by('-is_superuser').first()
+        if author is None:
+            raise CommandError('数据库中没有用户，无法提交测试评论')
+
+        workers = options['workers']
+        count = options['count']
+        url = reverse('comment:comment_create', args=[article_index_id])
+        barrier = threading.Barrier(workers + 1)
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            client.force_login(author)
+            own_latencies = []
+            own_failures = 0
+            try:
+                barrier.wait()
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = client.post(url, {'content': BENCH_CONTENT})
+                    own_latencies.append(time.perf_counter() - start)
+                    if response.status_code != 302:
+                        own_failures += 1
+            finally:
+                with lock:
+                    latencies.extend(own_latencies)
+                    failures.append(own_failures)
+                connection.close()
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(worker) for _ in range(workers)]
+                barrier.wait()
+                start = time.perf_counter()
+                for future in futures:
+                    future.result()
+                elapsed = time.perf_counter() - start
+        finally:
+            Comment.objects.filter(article_index_id=article_index_id, content=BENCH_CONTENT).delete()
+
+        total = len(latencies)
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        self.stdout.write(f'{total} posts in {elapsed:.2f}s, {total / elapsed:.1f} posts/sec, {sum(failures)} failed')
+        self.stdout.write(f'p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_current_versions(apps, schema_editor):
+    """
+    为每个 index_id 把 update_time 最新的版本标记为当前版本
+    """
+    Comment = apps.get_model('comment', 'Comment')
+    index_ids = Comment.objects.order_by().values_list('index_id', flat=True).distinct()
+    for index_id in index_ids.iterator():
+        head = Comment.objects.filter(index_id=index_id).order_by('-update_time').values_list('pk', flat=True).first()
+        Comment.objects.filter(pk=head).update(is_current=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comment', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_current',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_current_versions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('deleted', False), ('hidden', False), ('is_current', True)), fields=['article_index_id', '-top', '-create_time'], name='comment_current_live_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('index_id',), name='unique_current_comment_version'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:01
+
+from django.db import migrations, models
+
+
+def create_index_id_sequence(apps, schema_editor):
+    """
+    从现有的最大 index_id 初始化计数行，PostgreSQL 上同时创建对应的序列
+    """
+    Comment = apps.get_model('comment', 'Comment')
+    Lock = apps.get_model('comment', 'Comment_index_id_ProductSequenceLock')
+    current_max = Comment.objects.aggregate(max_val=models.Max('index_id'))['max_val'] or 0
+    Lock.objects.update_or_create(pk=1, defaults={'value': current_max})
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE SEQUENCE IF NOT EXISTS comment_index_id_seq')
+        schema_editor.execute("SELECT setval('comment_index_id_seq', %s, false)", [current_max + 1])
+
+
+def drop_index_id_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS comment_index_id_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comment', '0002_comment_is_current'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment_index_id_productsequencelock',
+            name='value',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(create_index_id_sequence, drop_index_id_sequence),
+    ]
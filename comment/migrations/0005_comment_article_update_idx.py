@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comment', '0004_rendered_html'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article_index_id', '-update_time'], name='comment_article_update_idx'),
+        ),
+    ]
@@ -1,13 +1,28 @@
 import uuid
 
-from article.models import Article
+from article.models import Article, VersionConflict, lock_current_version
+from blog.rendering import RENDERER_VERSION, render_comment
+from blog.sequences import next_index_id
 from django.contrib import admin
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
 from user.models import CustomUser
 
 
+class CommentQuerySet(models.QuerySet):
+    def current(self):
+        """
+        只返回每个 index_id 的当前版本（由 is_current 标记维护）
+        """
+        return self.filter(is_current=True)
+
+
 class Comment_index_id_ProductSequenceLock(models.Model):
-    pass
+    """
+    Comment.index_id 的计数模型。
+    PostgreSQL 使用 comment_index_id_seq 序列分配 index_id，
+    其他数据库使用这一行的 value 作为回退计数。
+    """
+    value = models.BigIntegerField(default=0)
 
     class Meta:
         verbose_name = "Comment.index_id序列锁"
@@ -25,25 +40,59 @@ class Comment(models.Model):
     top = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
     hidden = models.BooleanField(default=False)
+    # 是否为该 index_id 的当前（最新）版本，由 save 维护
+    is_current = models.BooleanField(default=False)
+    # 保存时渲染好的 HTML，render_version 与 RENDERER_VERSION 不一致时视为过期
+    content_html = models.TextField(blank=True, default='')
+    render_version = models.PositiveIntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
+
+    def render_content(self, save=True):
+        """
+        渲染 Markdown 内容，save 为 True 时只把渲染结果写回数据库
+        """
+        self.content_html = render_comment(self.content)
+        self.render_version = RENDERER_VERSION
+        if save:
+            Comment.objects.filter(pk=self.pk).update(
+                content_html=self.content_html,
+                render_version=self.render_version
+            )
+
+    def ensure_rendered(self):
+        """
+        渲染结果由旧版本渲染器生成时，重新渲染并写回
+        """
+        if self.render_version != RENDERER_VERSION:
+            self.render_content()
 
     def get_article(self):
-        return Article.objects.filter(
+        return Article.objects.current().filter(
             index_id=self.article_index_id,
             deleted=False
-        ).order_by('-updated_at').first()
+        ).first()
 
     def save(self, *args, **kwargs):
+        self.render_content(save=False)
+
         if self.index_id is None:
+            # 序列分配不需要全站范围的锁，也不需要对整张表做 Max 聚合
+            self.index_id = next_index_id(Comment, Comment_index_id_ProductSequenceLock, 'comment_index_id_seq')
+            self.is_current = True
+            super().save(*args, **kwargs)
+        elif self._state.adding:
+            # 为已有的 index_id 写入新版本：锁住并撤下旧的当前版本，再保存自己
             with transaction.atomic():
+                previous = lock_current_version(Comment, self.index_id, 'pk')
+                if previous is not None:
+                    Comment.objects.filter(pk=previous[0]).update(is_current=False)
+                self.is_current = True
                 try:
-                    lock = Comment_index_id_ProductSequenceLock.objects.select_for_update().get(pk=1)
-                except Comment_index_id_ProductSequenceLock.DoesNotExist:
-                    lock = Comment_index_id_ProductSequenceLock.objects.create(pk=1)
-
-                max_result = Comment.objects.aggregate(max_val=models.Max('index_id'))
-                current_max = max_result['max_val']
-                self.index_id = (current_max or 0) + 1
-                super().save(*args, **kwargs)
+                    with transaction.atomic():
+                        super().save(*args, **kwargs)
+                except IntegrityError:
+                    raise VersionConflict(f'评论 {self.index_id} 已被同时修改')
         else:
             super().save(*args, **kwargs)
 
@@ -51,6 +100,25 @@ class Comment(models.Model):
         verbose_name = '评论'
         verbose_name_plural = verbose_name
         ordering = ['-top', '-create_time']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['index_id'],
+                condition=models.Q(is_current=True),
+                name='unique_current_comment_version'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['article_index_id', '-top', '-create_time'],
+                condition=models.Q(is_current=True, deleted=False, hidden=False),
+                name='comment_current_live_idx'
+            ),
+            # 评论页条件 GET 查询该文章最新的 update_time
+            models.Index(
+                fields=['article_index_id', '-update_time'],
+                name='comment_article_update_idx'
+            )
+        ]
 
 
 admin.site.register(Comment)
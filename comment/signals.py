@@ -0,0 +1,13 @@
+from blog.cache import invalidate_comment_pages
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Comment
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_cached_pages(sender, instance, **kwargs):
+    """
+    评论保存后，使所属文章的详情页和评论页的缓存失效
+    """
+    transaction.on_commit(lambda: invalidate_comment_pages(instance.article_index_id))
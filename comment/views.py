@@ -1,20 +1,44 @@
-import markdown
-
-from article.models import Article
+from article.models import Article, VersionConflict
+from blog.cache import cache_anonymous_page, invalidate_comment_pages
+from blog.conditional import conditional_page
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Subquery
 from django.shortcuts import render, redirect
+from django.utils import timezone
 from .forms import CommentForm
 from .models import Comment
 
 
+def comment_list_validators(request, article_index_id, page=1):
+    """
+    评论页的条件 GET 校验：文章当前版本 id 和该文章所有评论版本中最新的 update_time
+    """
+    latest_comment = Comment.objects.filter(
+        article_index_id=article_index_id
+    ).order_by('-update_time').values('update_time')[:1]
+    head = Article.objects.current().filter(
+        index_id=article_index_id,
+        deleted=False
+    ).annotate(
+        last_comment_time=Subquery(latest_comment)
+    ).values_list('id', 'updated_at', 'last_comment_time').first()
+    if head is None:
+        return None
+    article_id, updated_at, last_comment_time = head
+    return (article_id, last_comment_time, page), max(updated_at, last_comment_time or updated_at)
+
+
+@conditional_page(comment_list_validators)
+@cache_anonymous_page('article', 'article_index_id')
 def comment_list(request, article_index_id, page=1):
     try:
-        article = Article.objects.filter(
+        article = Article.objects.current().filter(
             index_id=article_index_id,
             deleted=False
-        ).order_by('-updated_at').first()
+        ).first()
 
         if not article:
             raise Article.DoesNotExist
@@ -25,33 +49,19 @@ def comment_list(request, article_index_id, page=1):
     except Article.DoesNotExist:
         return render(request, '404.html', status=404)
 
-    all_comments = Comment.objects.filter(
+    comments = Comment.objects.current().filter(
         article_index_id=article_index_id,
         deleted=False,
         hidden=False
-    ).order_by('-update_time')
-
-    latest_comments = {}
-    for comment in all_comments:
-        if comment.index_id not in latest_comments:
-            latest_comments[comment.index_id] = comment
-
-    comments = list(latest_comments.values())
-    comments.sort(key=lambda x: (not x.top, x.create_time), reverse=True)
-
-    md = markdown.Markdown(extensions=[
-        'markdown.extensions.extra',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.nl2br',
-    ])
-
-    for comment in comments:
-        comment.content_html = md.convert(comment.content)
+    ).select_related('author').order_by('-top', '-create_time')
 
     paginator = Paginator(comments, 15)
     page_obj = paginator.get_page(page)
 
+    # 使用保存时渲染好的HTML，渲染器版本过期时才重新渲染
+    for comment in page_obj:
+        comment.ensure_rendered()
+
     context = {
         'article': article,
         'page_obj': page_obj,
@@ -62,10 +72,10 @@ def comment_list(request, article_index_id, page=1):
 @login_required
 def comment_create(request, article_index_id):
     try:
-        article = Article.objects.filter(
+        article = Article.objects.current().filter(
             index_id=article_index_id,
             deleted=False
-        ).order_by('-updated_at').first()
+        ).first()
 
         if not article:
             raise Article.DoesNotExist
@@ -99,9 +109,9 @@ def comment_create(request, article_index_id):
 @login_required
 def comment_update(request, comment_index_id):
     try:
-        old_comment = Comment.objects.filter(
+        old_comment = Comment.objects.current().filter(
             index_id=comment_index_id
-        ).order_by('-update_time').first()
+        ).first()
 
         if not old_comment:
             raise Comment.DoesNotExist
@@ -126,9 +136,13 @@ def comment_update(request, comment_index_id):
             comment.author = old_comment.author
             comment.top = old_comment.top
             comment.hidden = old_comment.hidden
-            comment.save()
-            messages.success(request, '评论修改成功')
-            return redirect('comment:comment_list', article_index_id=old_comment.article_index_id, page=1)
+            try:
+                comment.save()
+            except VersionConflict:
+                messages.error(request, '评论刚刚被其他人修改过，请刷新页面确认后重新提交')
+            else:
+                messages.success(request, '评论修改成功')
+                return redirect('comment:comment_list', article_index_id=old_comment.article_index_id, page=1)
     else:
         form = CommentForm(initial={'content': old_comment.content})
 
@@ -142,9 +156,9 @@ def comment_update(request, comment_index_id):
 @login_required
 def comment_delete(request, comment_index_id):
     try:
-        comment = Comment.objects.filter(
+        comment = Comment.objects.current().filter(
             index_id=comment_index_id
-        ).order_by('-update_time').first()
+        ).first()
 
         if not comment:
             raise Comment.DoesNotExist
@@ -161,7 +175,10 @@ def comment_delete(request, comment_index_id):
         return render(request, '404.html', status=404)
 
     if request.method == 'POST':
-        Comment.objects.filter(index_id=comment_index_id).update(deleted=True)
+        with transaction.atomic():
+            # 同时刷新 update_time，使评论页的 ETag / Last-Modified 随之变化
+            Comment.objects.filter(index_id=comment_index_id).update(deleted=True, update_time=timezone.now())
+            transaction.on_commit(lambda: invalidate_comment_pages(comment.article_index_id))
         messages.success(request, '评论已删除')
         return redirect('comment:comment_list', article_index_id=comment.article_index_id, page=1)
 
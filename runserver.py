@@ -1,16 +1,107 @@
+import argparse
+import gc
+import multiprocessing
 import os
 import sys
 
+
+def parse_args():
+    """
+    命令行参数，未指定时从环境变量读取
+    """
+    parser = argparse.ArgumentParser(description='校园博客服务器')
+    parser.add_argument('--production', action='store_true',
+                        default=os.getenv('BLOG_SERVER_MODE', 'dev').lower() == 'production',
+                        help='使用多进程生产模式（也可设置 BLOG_SERVER_MODE=production）')
+    parser.add_argument('--bind', default=os.getenv('BLOG_BIND', '0.0.0.0:8000'), help='监听地址')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.getenv('BLOG_WORKERS') or multiprocessing.cpu_count() * 2 + 1),
+                        help='工作进程数')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('BLOG_THREADS', '4')),
+                        help='每个工作进程的线程数')
+    parser.add_argument('--max-requests', type=int, default=int(os.getenv('BLOG_MAX_REQUESTS', '1000')),
+                        help='工作进程处理多少个请求后被平滑替换（0 表示不替换）')
+    parser.add_argument('--max-requests-jitter', type=int, default=int(os.getenv('BLOG_MAX_REQUESTS_JITTER', '100')),
+                        help='max-requests 的随机抖动，避免所有进程同时重启')
+    parser.add_argument('--backlog', type=int, default=int(os.getenv('BLOG_BACKLOG', '2048')),
+                        help='监听队列长度')
+    parser.add_argument('--timeout', type=int, default=int(os.getenv('BLOG_TIMEOUT', '120')),
+                        help='工作进程无响应多少秒后被重启（大文件上传需要较长时间）')
+    return parser.parse_args()
+
+
+def run_production_server(options):
+    """
+    以预先 fork 的多个工作进程、每个进程多线程的方式运行（基于 gunicorn）
+    """
+    from blog.wsgi import application
+    from django.db import connections
+    from gunicorn.app.base import BaseApplication
+
+    def when_ready(server):
+        # 关闭主进程在迁移时打开的数据库连接，避免连接被 fork 出的工作进程共享
+        connections.close_all()
+        # 冻结应用导入后已存在的对象：子进程的垃圾回收不再扫描它们，
+        # 这些内存页不会因为引用计数以外的写入而被复制
+        gc.collect()
+        gc.freeze()
+
+    class BlogApplication(BaseApplication):
+        def load_config(self):
+            config = {
+                'bind': options.bind,
+                'workers': options.workers,
+                'threads': options.threads,
+                'worker_class': 'gthread',
+                'max_requests': options.max_requests,
+                'max_requests_jitter': options.max_requests_jitter,
+                'backlog': options.backlog,
+                'timeout': options.timeout,
+                'graceful_timeout': options.timeout,
+                'preload_app': True,
+                'when_ready': when_ready,
+            }
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    BlogApplication().run()
+
+
 if __name__ == '__main__':
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
     
     if getattr(sys, 'frozen', False):
         sys.path.insert(0, os.path.join(sys._MEIPASS, '_internal'))
-    
+
+    # 服务器参数也可以写在 .env 中
+    from dotenv import load_dotenv
+    load_dotenv()
+    options = parse_args()
+    if options.production:
+        # 命令行指定 --production 时，settings 同样按生产模式选择缓存后端
+        os.environ['BLOG_SERVER_MODE'] = 'production'
+
     import django
     django.setup()
     from django.core.management import call_command
     print("Running migrations, please wait...")
     call_command("migrate", verbosity=1, interactive=False)
-    from django.core.management import execute_from_command_line
-    execute_from_command_line([sys.argv[0], 'runserver', '--noreload', '0.0.0.0:8000'])
+
+    if options.production:
+        from django.conf import settings
+        if options.workers > 1 and settings.CACHE_BACKEND == 'locmem':
+            print("=" * 70, file=sys.stderr)
+            print("警告：CACHE_BACKEND=locmem 时各工作进程的缓存互相独立，", file=sys.stderr)
+            print("文章修改或删除后，其他进程会在缓存过期前继续返回旧页面。", file=sys.stderr)
+            print("多进程模式请使用 file / redis / memcached 缓存，或设置 --workers 1。", file=sys.stderr)
+            print("=" * 70, file=sys.stderr)
+        # 生成带指纹的静态文件和预压缩副本
+        print("Collecting static files, please wait...")
+        call_command("collectstatic", verbosity=0, interactive=False)
+        run_production_server(options)
+    else:
+        from django.core.management import execute_from_command_line
+        execute_from_command_line([sys.argv[0], 'runserver', '--noreload', options.bind])
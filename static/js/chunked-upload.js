@@ -0,0 +1,157 @@
+/**
+ * 分块、可续传的附件上传
+ *
+ * 用法：
+ *   const upload = new ChunkedUpload(file, {initUrl, chunkUrl, finalizeUrl, csrfToken});
+ *   upload.onprogress = (loaded, total) => { ... };
+ *   upload.start().then(fileData => { ... }).catch(error => { ... });
+ *
+ * chunkUrl / finalizeUrl 中的 UPLOAD_ID 会被替换为上传会话 ID。
+ * 会话 ID 按文件名、大小和修改时间保存在 localStorage 中，
+ * 页面刷新或网络中断后再次上传同一文件时，从服务器已接收的位置继续。
+ */
+(function (window) {
+    'use strict';
+
+    const STORAGE_PREFIX = 'chunked-upload:';
+    const MAX_RETRIES = 5;
+
+    function ChunkedUpload(file, options) {
+        this.file = file;
+        this.options = options;
+        this.onprogress = null;
+        this.aborted = false;
+        this.uploadId = null;
+        this.xhr = null;
+        this.storageKey = STORAGE_PREFIX + [file.name, file.size, file.lastModified].join(':');
+    }
+
+    ChunkedUpload.prototype.url = function (template) {
+        return template.replace('UPLOAD_ID', this.uploadId);
+    };
+
+    ChunkedUpload.prototype.request = function (method, url, body, onUploadProgress) {
+        const self = this;
+        return new Promise(function (resolve, reject) {
+            const xhr = new XMLHttpRequest();
+            self.xhr = xhr;
+            xhr.open(method, url, true);
+            xhr.setRequestHeader('X-CSRFToken', self.options.csrfToken);
+            xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+            if (onUploadProgress) {
+                xhr.upload.addEventListener('progress', onUploadProgress);
+            }
+            xhr.addEventListener('load', function () {
+                let response = null;
+                try {
+                    response = JSON.parse(xhr.responseText);
+                } catch (e) {
+                    response = {success: false, error: '服务器错误'};
+                }
+                resolve({status: xhr.status, data: response});
+            });
+            xhr.addEventListener('error', function () {
+                reject(new Error('网络错误'));
+            });
+            xhr.addEventListener('abort', function () {
+                reject(new Error('上传已取消'));
+            });
+            xhr.send(body);
+        });
+    };
+
+    ChunkedUpload.prototype.reportProgress = function (loaded) {
+        if (this.onprogress) {
+            this.onprogress(Math.min(loaded, this.file.size), this.file.size);
+        }
+    };
+
+    // 恢复上次未完成的会话，或创建新会话；返回服务器已接收的字节数
+    ChunkedUpload.prototype.open = async function () {
+        const savedId = window.localStorage.getItem(this.storageKey);
+        if (savedId) {
+            this.uploadId = savedId;
+            const result = await this.request('GET', this.url(this.options.chunkUrl));
+            if (result.status === 200 && result.data.success) {
+                this.chunkSize = result.data.chunk_size;
+                return result.data.received;
+            }
+            window.localStorage.removeItem(this.storageKey);
+        }
+
+        const formData = new FormData();
+        formData.append('filename', this.file.name);
+        formData.append('file_size', this.file.size);
+        const result = await this.request('POST', this.options.initUrl, formData);
+        if (result.status !== 200 || !result.data.success) {
+            throw new Error(result.data.error || '创建上传失败');
+        }
+        this.uploadId = result.data.upload_id;
+        this.chunkSize = result.data.chunk_size;
+        window.localStorage.setItem(this.storageKey, this.uploadId);
+        return 0;
+    };
+
+    ChunkedUpload.prototype.start = async function () {
+        let offset = await this.open();
+        let retries = 0;
+        this.reportProgress(offset);
+
+        while (offset < this.file.size) {
+            if (this.aborted) {
+                throw new Error('上传已取消');
+            }
+            const chunk = this.file.slice(offset, offset + this.chunkSize);
+            const chunkStart = offset;
+            let result;
+            try {
+                result = await this.request(
+                    'PUT',
+                    this.url(this.options.chunkUrl) + '?offset=' + offset,
+                    chunk,
+                    (e) => this.reportProgress(chunkStart + e.loaded)
+                );
+            } catch (error) {
+                if (this.aborted || ++retries > MAX_RETRIES) {
+                    throw error;
+                }
+                // 网络错误：等待后向服务器确认已接收的位置再继续
+                await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+                offset = await this.open();
+                continue;
+            }
+
+            if (result.status === 200 && result.data.success) {
+                offset = result.data.received;
+                retries = 0;
+            } else if (result.status === 409 && typeof result.data.received === 'number') {
+                // 偏移量不一致（例如上一个分块实际已写入），从服务器的位置继续
+                offset = result.data.received;
+            } else if (++retries > MAX_RETRIES) {
+                throw new Error(result.data.error || '上传失败');
+            }
+            this.reportProgress(offset);
+        }
+
+        const result = await this.request('POST', this.url(this.options.finalizeUrl));
+        if (result.status !== 200 || !result.data.success) {
+            throw new Error(result.data.error || '上传失败');
+        }
+        window.localStorage.removeItem(this.storageKey);
+        return result.data;
+    };
+
+    // 取消上传并删除服务器上已接收的部分
+    ChunkedUpload.prototype.abort = function () {
+        this.aborted = true;
+        if (this.xhr) {
+            this.xhr.abort();
+        }
+        window.localStorage.removeItem(this.storageKey);
+        if (this.uploadId) {
+            this.request('DELETE', this.url(this.options.chunkUrl)).catch(function () {});
+        }
+    };
+
+    window.ChunkedUpload = ChunkedUpload;
+})(window);